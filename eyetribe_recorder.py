@@ -0,0 +1,177 @@
+"""
+Headless Eye Tribe recorder.
+
+Starts capturing as soon as possible: only the standard library and
+new_eyetribe_utils are imported at startup, and optional subsystems
+(signal-quality report, session catalogue, Feather export) are imported
+only when their options are used, after recording has stopped.
+
+Usage:
+    python eyetribe_recorder.py -o gaze_P01.csv
+    python eyetribe_recorder.py --send "IMAGE DSC_0004.JPG ON"
+"""
+import time
+
+_start = time.perf_counter()
+
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+
+from new_eyetribe_utils import EyeTrackingRecorder, start_eyetracker, stop_eyetracker
+
+IMPORT_TIME = time.perf_counter() - _start
+
+MARKER_HOST = '127.0.0.1'
+MARKER_PORT = 6556
+
+
+def send_marker(message, host=MARKER_HOST, port=MARKER_PORT):
+    """
+    Send a marker to a running recorder from any process.
+
+    Args:
+        message: Message text to record (e.g. "Stimulus ON")
+        host: Marker socket host of the recorder
+        port: Marker socket port of the recorder
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(message.encode('utf-8'), (host, port))
+    finally:
+        sock.close()
+
+
+class MarkerListener:
+    """
+    Receives markers as UDP datagrams on a local port and forwards them to
+    the recorder. The thread waits in a selector on the marker socket and a
+    wake-up socketpair; closing a socket does not wake a thread blocked in
+    recvfrom, so stop() writes to the socketpair instead.
+    """
+    def __init__(self, recorder, host=MARKER_HOST, port=MARKER_PORT):
+        self.recorder = recorder
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.wake_recv, self.wake_send = socket.socketpair()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ, self.sock)
+        self.selector.register(self.wake_recv, selectors.EVENT_READ, None)
+        self.thread = threading.Thread(target=self._listen, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _listen(self):
+        while True:
+            for key, _ in self.selector.select():
+                if key.data is None:
+                    return
+                try:
+                    data, _ = self.sock.recvfrom(65535)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except OSError:
+                    return
+                message = data.decode('utf-8', errors='replace').strip()
+                if message:
+                    self.recorder.send_message(message)
+
+    def stop(self):
+        self.wake_send.send(b"\0")
+        self.thread.join(timeout=1.0)
+        self.selector.close()
+        for sock in (self.sock, self.wake_recv, self.wake_send):
+            sock.close()
+
+
+def parse_args(argv):
+    # argparse costs several milliseconds to import, so it is loaded here
+    # rather than at module level
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless Eye Tribe recorder.")
+    parser.add_argument("-o", "--output", help="output CSV file (auto-generated if omitted)")
+    parser.add_argument("--host", default='127.0.0.1', help="Eye Tribe server host")
+    parser.add_argument("--port", type=int, default=6555, help="Eye Tribe server port")
+    parser.add_argument("--marker-port", type=int, default=MARKER_PORT,
+                        help="local UDP port accepting markers from other processes")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--send", metavar="MESSAGE",
+                        help="send a marker to a running recorder and exit")
+    parser.add_argument("--quality", action="store_true",
+                        help="print per-trial data loss when recording stops")
+    parser.add_argument("--catalogue", metavar="DB",
+                        help="index the recording into a session catalogue when it stops")
+    parser.add_argument("--feather", action="store_true",
+                        help="also write the recording as Arrow/Feather files when it stops")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.send is not None:
+        send_marker(args.send, port=args.marker_port)
+        return 0
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    launch = time.perf_counter()
+    sock = start_eyetracker(args.host, args.port)
+    if sock is None:
+        return 1
+    recorder = EyeTrackingRecorder(sock, output_file=args.output)
+    recorder.start_recording()
+
+    try:
+        listener = MarkerListener(recorder, port=args.marker_port)
+        listener.start()
+        print(f"Accepting markers on udp://{MARKER_HOST}:{args.marker_port}")
+    except OSError as e:
+        print(f"[WARNING] Marker socket unavailable: {e}")
+        listener = None
+
+    print(f"Import time: {IMPORT_TIME * 1000:.1f} ms")
+    if recorder.first_sample.wait(timeout=5.0):
+        print(f"Time to first sample: {(recorder.first_sample_time - launch) * 1000:.1f} ms "
+              f"({(recorder.first_sample_time - _start) * 1000:.1f} ms since process start)")
+    else:
+        print("[WARNING] No sample received within 5 s.")
+
+    stop.wait(timeout=args.duration)
+
+    if listener:
+        listener.stop()
+    rows = recorder.stop_recording()
+    stop_eyetracker(sock)
+
+    # Optional subsystems, imported only when requested
+    if args.quality:
+        from signal_quality import clean_session
+        from gaze_session import load_session
+
+        for row in clean_session(load_session(recorder.output_file))["trial_loss"]:
+            print(f"Trial {row['trial']} ({row['image']}): {row['loss_pct']:.1f}% lost")
+    if args.catalogue:
+        from session_catalogue import SessionCatalogue
+
+        catalogue = SessionCatalogue(args.catalogue)
+        catalogue.ingest(os.path.abspath(recorder.output_file))
+        catalogue.close()
+    if args.feather:
+        from feather_export import export_rows
+
+        samples_path, events_path = export_rows(rows, os.path.splitext(recorder.output_file)[0])
+        print(f"Feather files written: {samples_path}, {events_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
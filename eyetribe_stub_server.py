@@ -0,0 +1,185 @@
+"""
+Local stand-in for the Eye Tribe server, for trying the recorders and
+clients without a tracker attached.
+
+It speaks the same line-delimited JSON protocol on a TCP port: push mode
+on/off, "get frame" requests, heartbeats and heartbeatinterval queries.
+Frames follow a slow circle around the screen centre.
+
+Usage:
+    python eyetribe_stub_server.py [port]
+"""
+import json
+import math
+import socket
+import threading
+import time
+
+HEARTBEAT_INTERVAL_MS = 3000
+
+
+def make_frame(t):
+    """
+    Synthetic gaze frame for time t, in the layout the Eye Tribe server sends.
+    """
+    x = 960.0 + 300.0 * math.cos(t)
+    y = 540.0 + 200.0 * math.sin(t)
+    psize = 18.0 + 0.5 * math.sin(t / 3.0)
+    eye = {"avg": {"x": x, "y": y}, "psize": psize, "raw": {"x": x, "y": y}}
+    return {
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "time": int(t * 1000),
+        "fix": True,
+        "state": 7,
+        "raw": {"x": x, "y": y},
+        "avg": {"x": x, "y": y},
+        "lefteye": eye,
+        "righteye": eye,
+    }
+
+
+class StubTrackerServer:
+    """
+    Threaded stand-in server; one thread per connected client.
+    """
+    def __init__(self, host='127.0.0.1', port=6555, push_rate=30.0):
+        """
+        Args:
+            host: Address to listen on
+            port: Port to listen on (0 picks a free port, see self.port)
+            push_rate: Frame rate in Hz while a client has push mode on
+        """
+        self.push_rate = push_rate
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.host, self.port = self.server.getsockname()[:2]
+        self.running = False
+        self.clients = []
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.running = False
+        # close() alone does not wake a thread blocked in accept() on Linux
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+        # shutdown() sends FIN to the client and wakes the thread blocked in
+        # recv(), so stopping the server looks like a dropped connection
+        for client in list(self.clients):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for thread in list(self.threads):
+            thread.join(timeout=1.0)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.clients.append(client)
+            self._spawn(self._client_loop, client)
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        self.threads = [t for t in self.threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def _reply(self, client, lock, obj):
+        with lock:
+            client.sendall(json.dumps(obj).encode('utf-8') + b'\n')
+
+    def _client_loop(self, client):
+        lock = threading.Lock()
+        push = threading.Event()
+        self._spawn(self._push_loop, client, lock, push)
+
+        buffer = ""
+        decoder = json.JSONDecoder()
+        try:
+            while self.running:
+                data = client.recv(4096)
+                if not data:
+                    break
+                buffer += data.decode('utf-8', errors='replace').strip()
+                while buffer:
+                    try:
+                        request, idx = decoder.raw_decode(buffer)
+                        buffer = buffer[idx:].lstrip()
+                    except json.JSONDecodeError:
+                        break
+                    self._handle(client, lock, push, request)
+        except OSError:
+            pass
+        finally:
+            if client in self.clients:
+                self.clients.remove(client)
+            client.close()
+            # Wake the push thread so it sees the closed socket and exits
+            push.set()
+
+    def _handle(self, client, lock, push, request):
+        category = request.get("category")
+        if category == "heartbeat":
+            self._reply(client, lock, {"category": "heartbeat", "statuscode": 200})
+            return
+        values = request.get("values")
+        if request.get("request") == "set" and isinstance(values, dict):
+            if "push" in values:
+                if values["push"]:
+                    push.set()
+                else:
+                    push.clear()
+            self._reply(client, lock, {"category": "tracker", "request": "set", "statuscode": 200})
+        elif request.get("request") == "get" and isinstance(values, list):
+            reply = {}
+            if "frame" in values:
+                reply["frame"] = make_frame(time.time())
+            if "heartbeatinterval" in values:
+                reply["heartbeatinterval"] = HEARTBEAT_INTERVAL_MS
+            if "push" in values:
+                reply["push"] = push.is_set()
+            self._reply(client, lock, {"category": "tracker", "request": "get",
+                                       "statuscode": 200, "values": reply})
+        else:
+            self._reply(client, lock, {"category": category, "statuscode": 400,
+                                       "values": {"statusmessage": "Unsupported request"}})
+
+    def _push_loop(self, client, lock, push):
+        interval = 1.0 / self.push_rate
+        next_frame = time.perf_counter()
+        while self.running and client.fileno() != -1:
+            if not push.wait(timeout=0.5):
+                continue
+            try:
+                self._reply(client, lock, {"category": "tracker", "request": "get", "statuscode": 200,
+                                           "values": {"frame": make_frame(time.time())}})
+            except OSError:
+                break
+            next_frame = max(next_frame + interval, time.perf_counter())
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6555
+    server = StubTrackerServer(port=port).start()
+    print(f"Stub Eye Tribe server listening on {server.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
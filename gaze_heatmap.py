@@ -0,0 +1,302 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+
+def gaussian_kernel(sigma_cells):
+    """
+    Build a normalised 2D Gaussian kernel (peak = 1) on the heatmap grid.
+
+    Args:
+        sigma_cells: Standard deviation of the Gaussian, in grid cells
+
+    Returns:
+        Square float32 array covering +/- 3 sigma
+    """
+    radius = max(1, int(math.ceil(3 * sigma_cells)))
+    axis = np.arange(-radius, radius + 1, dtype=np.float32)
+    g = np.exp(-(axis ** 2) / (2.0 * sigma_cells ** 2))
+    return np.outer(g, g).astype(np.float32)
+
+
+def heat_colormap():
+    """
+    256-entry RGBA lookup table: transparent -> red -> yellow -> white.
+    """
+    ramp = np.linspace(0.0, 1.0, 256, dtype=np.float32)
+    lut = np.empty((256, 4), dtype=np.uint8)
+    lut[:, 0] = np.clip(ramp * 3.0, 0, 1) * 255
+    lut[:, 1] = np.clip(ramp * 3.0 - 1.0, 0, 1) * 255
+    lut[:, 2] = np.clip(ramp * 3.0 - 2.0, 0, 1) * 255
+    lut[:, 3] = np.clip(ramp * 1.5, 0, 0.7) * 255
+    return lut
+
+
+class GazeHeatmap:
+    """
+    Incremental, exponentially decaying gaze heatmap.
+
+    Each sample is splatted into a downsampled grid with a precomputed
+    Gaussian kernel. Decay is applied lazily: the grid is stored relative to
+    a reference time and only scaled when rendering (or when the stored
+    values would grow too large), so adding a sample costs one small slice add.
+    """
+    def __init__(self, screen_width, screen_height, cell_size=8, sigma=40.0,
+                 half_life=2.0, refresh_interval=0.05, colormap=None, background=(0, 0, 0),
+                 bands=8):
+        """
+        Initialize the heatmap accumulator.
+
+        Args:
+            screen_width: Width of the display in pixels
+            screen_height: Height of the display in pixels
+            cell_size: Size of one grid cell in pixels (downsampling factor)
+            sigma: Standard deviation of the splat kernel in pixels
+            half_life: Time in seconds for the heat to decay by half
+            refresh_interval: Minimum time in seconds between texture updates
+                for renderers that rebuild the whole map (the heat changes
+                slowly, so 20 Hz is enough)
+            colormap: Optional (256, 4) uint8 RGBA lookup table
+            background: RGB colour behind the pygame surface where no
+                stimulus is set (see set_background)
+            bands: Number of horizontal bands the pygame surface is refreshed in
+        """
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.cell_size = cell_size
+        self.grid_width = int(math.ceil(screen_width / cell_size))
+        self.grid_height = int(math.ceil(screen_height / cell_size))
+        self.grid = np.zeros((self.grid_height, self.grid_width), dtype=np.float32)
+
+        self.kernel = gaussian_kernel(sigma / cell_size)
+        self.radius = self.kernel.shape[0] // 2
+        self.decay_rate = math.log(2.0) / half_life
+        self.colormap = heat_colormap() if colormap is None else colormap
+        self.background = tuple(background)
+
+        self.refresh_interval = refresh_interval
+        self.band_rows = int(math.ceil(self.grid_height / bands))
+        self.bands = int(math.ceil(self.grid_height / self.band_rows))
+        self.next_band = 0
+        self.cycle_time = None
+        self.cycle_norm = None
+        self.stimulus = None
+        self.base = None
+        self.surface = None
+
+        self.ref_time = time.time()
+        self.lock = threading.Lock()
+
+    def _rebase(self, now):
+        # Fold the pending decay into the stored grid and move the reference time
+        self.grid *= math.exp(-self.decay_rate * (now - self.ref_time))
+        self.ref_time = now
+
+    def add_sample(self, x, y, t=None, weight=1.0):
+        """
+        Splat one gaze sample into the heatmap.
+
+        Args:
+            x: Horizontal gaze position in screen pixels
+            y: Vertical gaze position in screen pixels
+            t: Sample time (defaults to time.time())
+            weight: Contribution of the sample at time t
+        """
+        if t is None:
+            t = time.time()
+        if not (0 <= x < self.screen_width and 0 <= y < self.screen_height):
+            return
+
+        cx = int(x // self.cell_size)
+        cy = int(y // self.cell_size)
+        r = self.radius
+
+        # Kernel window clipped to the grid
+        x0, x1 = max(cx - r, 0), min(cx + r + 1, self.grid_width)
+        y0, y1 = max(cy - r, 0), min(cy + r + 1, self.grid_height)
+        kx0, ky0 = x0 - (cx - r), y0 - (cy - r)
+
+        with self.lock:
+            # Store the weight relative to ref_time so old heat never needs touching
+            exponent = self.decay_rate * (t - self.ref_time)
+            if exponent > 12.0:
+                self._rebase(t)
+                exponent = 0.0
+            scale = math.exp(exponent)
+            self.grid[y0:y1, x0:x1] += (weight * scale) * \
+                self.kernel[ky0:ky0 + (y1 - y0), kx0:kx0 + (x1 - x0)]
+
+    def clear(self):
+        """
+        Reset the heatmap.
+        """
+        with self.lock:
+            self.grid.fill(0.0)
+            self.ref_time = time.time()
+
+    def peak_norm(self, t=None):
+        """
+        Scale factor mapping the decayed heat at time t to 0-255.
+
+        The map is normalised to its peak, but never amplified below the
+        height of one fresh sample, so a stale map fades out instead of
+        staying saturated.
+        """
+        if t is None:
+            t = time.time()
+        with self.lock:
+            peak = float(self.grid.max()) * math.exp(-self.decay_rate * (t - self.ref_time))
+        return 255.0 / max(peak, 1.0)
+
+    def intensity(self, t=None, rows=slice(None), norm=None):
+        """
+        Return the decayed heat grid normalised to 0-255.
+
+        Args:
+            t: Render time (defaults to time.time())
+            rows: Grid rows to return
+            norm: Scale factor from peak_norm (defaults to the current one);
+                heat above the normalised peak saturates at 255
+
+        Returns:
+            uint8 array of shape (grid_height, grid_width)
+        """
+        if t is None:
+            t = time.time()
+        if norm is None:
+            norm = self.peak_norm(t)
+        with self.lock:
+            gain = norm * math.exp(-self.decay_rate * (t - self.ref_time))
+            values = self.grid[rows] * gain
+        return np.minimum(values, 255.0).astype(np.uint8)
+
+    def to_rgba(self, t=None):
+        """
+        Colour-mapped heatmap as an RGBA array of shape (grid_height, grid_width, 4).
+        """
+        return self.colormap[self.intensity(t)]
+
+    def set_background(self, stimulus=None):
+        """
+        Set the image the pygame heatmap is drawn over.
+
+        Call this whenever the stimulus on screen changes; the stimulus is
+        scaled to the screen size once here, not per frame.
+
+        Args:
+            stimulus: pygame.Surface shown under the heatmap, or None for
+                the plain background colour
+        """
+        self.stimulus = stimulus
+        self.base = None
+
+    def _prepare_surfaces(self):
+        import pygame
+
+        size = (self.grid_width * self.cell_size, self.grid_height * self.cell_size)
+        has_display = pygame.display.get_surface() is not None
+        self.base = pygame.Surface(size)
+        if has_display:
+            self.base = self.base.convert()
+        self.base.fill(self.background)
+        if self.stimulus is not None:
+            self.base.blit(pygame.transform.scale(self.stimulus,
+                                                  (self.screen_width, self.screen_height)), (0, 0))
+        # The heat is redrawn band by band, starting from the bare stimulus
+        self.surface = self.base.copy()
+
+    def to_pygame_surface(self, t=None):
+        """
+        Render the heatmap over the stimulus as one full-screen pygame surface.
+
+        The returned surface already contains the stimulus (set_background),
+        so it is blitted in place of the screen fill and the display pays no
+        per-pixel alpha blit. Scaling the whole grid up to full screen takes
+        a few milliseconds, so each call recolours and re-scales only one
+        horizontal band: the stimulus pixels of that band are restored and
+        the scaled band is alpha-blended onto them. All bands of one cycle
+        are drawn at the time and peak normalisation of the cycle's first
+        band, so neighbouring bands never differ in gain; at 60 Hz a cycle
+        takes bands / 60 seconds.
+
+        Args:
+            t: Render time (defaults to time.time())
+
+        Returns:
+            pygame.Surface of the grid size times cell_size (at least the screen size)
+        """
+        import pygame
+
+        if t is None:
+            t = time.time()
+        if self.base is None:
+            self._prepare_surfaces()
+        if self.next_band == 0:
+            self.cycle_time = t
+            self.cycle_norm = self.peak_norm(t)
+
+        cell = self.cell_size
+        r0 = self.next_band * self.band_rows
+        r1 = min(r0 + self.band_rows, self.grid_height)
+        self.next_band = (self.next_band + 1) % self.bands
+
+        rect = pygame.Rect(0, r0 * cell, self.grid_width * cell, (r1 - r0) * cell)
+        self.surface.blit(self.base, rect, rect)
+        levels = self.intensity(self.cycle_time, slice(r0, r1), self.cycle_norm)
+        if not levels.any():
+            return self.surface
+        rgba = np.ascontiguousarray(self.colormap[levels])
+        small = pygame.image.frombuffer(rgba.tobytes(), (self.grid_width, r1 - r0), "RGBA")
+        if pygame.display.get_surface() is not None:
+            # Blending an unconverted RGBA surface is an order of magnitude slower
+            small = small.convert_alpha()
+        self.surface.blit(pygame.transform.scale(small, rect.size), rect)
+        return self.surface
+
+    def to_psychopy_arrays(self, t=None):
+        """
+        Render the heatmap for a PsychoPy ImageStim.
+
+        Returns:
+            Tuple (rgb, mask) of float arrays in PsychoPy's -1..1 range, flipped
+            vertically because PsychoPy puts the first array row at the bottom
+        """
+        rgba = self.to_rgba(t)[::-1]
+        rgb = rgba[:, :, :3].astype(np.float32) / 127.5 - 1.0
+        mask = rgba[:, :, 3].astype(np.float32) / 127.5 - 1.0
+        return rgb, mask
+
+
+if __name__ == "__main__":
+    import os
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+
+    # Per-frame cost at 1920x1080: one 60 Hz sample, one render and the blit
+    pygame.init()
+    screen = pygame.display.set_mode((1920, 1080))
+    heatmap = GazeHeatmap(1920, 1080)
+    rng = np.random.default_rng(0)
+    stimulus = pygame.surfarray.make_surface(rng.integers(0, 256, (1024, 768, 3), dtype=np.uint8))
+    heatmap.set_background(stimulus)
+    points = rng.uniform((0, 0), (1920, 1080), size=(2000, 2))
+    t0 = heatmap.ref_time
+
+    # The first call scales the stimulus and allocates the full-screen surfaces
+    start = time.perf_counter()
+    heatmap.to_pygame_surface(t=t0)
+    print(f"Surface setup: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+    times = []
+    for i, (x, y) in enumerate(points):
+        start = time.perf_counter()
+        heatmap.add_sample(x, y, t=t0 + i / 60.0)
+        screen.blit(heatmap.to_pygame_surface(t=t0 + i / 60.0), (0, 0))
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1000
+    print(f"Sample + render + blit: mean {times.mean():.3f} ms, "
+          f"p99 {np.percentile(times, 99):.3f} ms, max {times.max():.3f} ms per frame")
+    pygame.quit()
@@ -0,0 +1,154 @@
+import csv
+import re
+
+import numpy as np
+
+FIELDNAMES = ["timestamp", "x", "y", "fix", "state", "left_psize", "right_psize", "message"]
+FLOAT_CHANNELS = ["x", "y", "left_psize", "right_psize"]
+
+TRIAL_PATTERN = re.compile(r"TRIAL (\d+) (START|END)")
+IMAGE_PATTERN = re.compile(r"IMAGE (.+) (ON|OFF)")
+
+
+def _float_column(values):
+    # Empty fields become NaN; numpy parses the remaining strings in C
+    return np.array([v if v else "nan" for v in values]).astype(np.float64)
+
+
+def header_columns(header):
+    """
+    Column index of each name in FIELDNAMES in a CSV header row (None if absent).
+    """
+    return [header.index(name) if name in header else None for name in FIELDNAMES]
+
+
+def split_rows(rows, cols):
+    """
+    Separate recorder CSV rows into eye data rows and message events.
+
+    Args:
+        rows: Iterable of rows (lists of strings); empty rows are skipped
+        cols: Column indices from header_columns
+
+    Returns:
+        Tuple (samples, events): the eye data rows, and (timestamp, message,
+        index) tuples of the message rows, index being the row's position
+        in rows (e.g. to look up its byte offset)
+    """
+    ts_col, msg_col = cols[0], cols[-1]
+    samples = []
+    events = []
+    for index, row in enumerate(rows):
+        if not row:
+            continue
+        if msg_col is not None and msg_col < len(row) and row[msg_col]:
+            events.append((float(row[ts_col]), row[msg_col], index))
+        else:
+            samples.append(row)
+    return samples, events
+
+
+def load_session(path):
+    """
+    Load a recorder CSV (as written by EyeTrackingRecorder) into NumPy arrays.
+
+    Eye data rows and message rows are separated: samples go into one array
+    per column, messages into a list of (timestamp, message) events.
+
+    Args:
+        path: Path to the CSV file
+
+    Returns:
+        Dictionary with float64 arrays "timestamp", "x", "y", "left_psize",
+        "right_psize" (NaN where empty), bool arrays "fix" and "fix_valid",
+        int32 array "state" (0 where empty) and the list "events"
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        cols = header_columns(next(reader))
+        samples, events = split_rows(reader, cols)
+    return columns_to_session(samples, cols, [(ts, msg) for ts, msg, _ in events])
+
+
+def columns_to_session(samples, cols, events):
+    """
+    Build a session dictionary from raw string rows.
+
+    Args:
+        samples: List of eye data rows (lists of strings)
+        cols: Column index of each name in FIELDNAMES (None if absent)
+        events: List of (timestamp, message) tuples
+
+    Returns:
+        Session dictionary as described in load_session
+    """
+    columns = list(zip(*samples))
+    get = dict(zip(FIELDNAMES, cols))
+
+    def column(name):
+        idx = get.get(name)
+        if idx is None or not columns:
+            return [""] * len(samples)
+        return columns[idx]
+
+    session = {"timestamp": _float_column(column("timestamp"))}
+    for name in FLOAT_CHANNELS:
+        session[name] = _float_column(column(name))
+
+    fix = np.array(column("fix"), dtype=object)
+    session["fix"] = fix == "True"
+    session["fix_valid"] = fix != ""
+
+    state = column("state")
+    session["state"] = np.array([v if v else "0" for v in state]).astype(np.int32)
+    session["events"] = sorted(events)
+    return session
+
+
+def rows_to_session(rows):
+    """
+    Build a session dictionary from in-memory recorder rows (e.g. recorder.all_rows).
+    """
+    samples = []
+    events = []
+    for row in rows:
+        if row.get("message"):
+            events.append((float(row["timestamp"]), row["message"]))
+        else:
+            samples.append([str(row.get(name, "")) for name in FIELDNAMES])
+    return columns_to_session(samples, list(range(len(FIELDNAMES))), events)
+
+
+def find_trials(events):
+    """
+    Pair TRIAL START/END and IMAGE ON/OFF messages into trials.
+
+    Args:
+        events: List of (timestamp, message) tuples
+
+    Returns:
+        List of dicts with "trial", "start", "end", "image", "image_on", "image_off"
+        (missing values are None)
+    """
+    trials = {}
+    current = None
+    for ts, message in events:
+        match = TRIAL_PATTERN.search(message)
+        if match:
+            num = int(match.group(1))
+            trial = trials.setdefault(num, {"trial": num, "start": None, "end": None,
+                                            "image": None, "image_on": None, "image_off": None})
+            if match.group(2) == "START":
+                trial["start"] = ts
+                current = trial
+            else:
+                trial["end"] = ts
+                current = None
+            continue
+
+        match = IMAGE_PATTERN.search(message)
+        if match and current is not None:
+            current["image"] = match.group(1)
+            current["image_on" if match.group(2) == "ON" else "image_off"] = ts
+
+    return [trials[num] for num in sorted(trials)]
@@ -0,0 +1,192 @@
+import math
+import os
+
+import numpy as np
+
+from gaze_session import FLOAT_CHANNELS, load_session
+
+
+def lod_path(session_path):
+    """
+    Path of the pyramid file stored alongside a session file.
+    """
+    return os.path.splitext(session_path)[0] + ".lod.npz"
+
+
+def _reduce_level(time, vmin, vmax, vsum, count, factor):
+    # Pad to a multiple of factor with neutral values and reduce each block
+    n = len(time)
+    pad = (-n) % factor
+    if pad:
+        time = np.concatenate((time, np.full(pad, time[-1])))
+        vmin = np.concatenate((vmin, np.full(pad, np.nan, dtype=vmin.dtype)))
+        vmax = np.concatenate((vmax, np.full(pad, np.nan, dtype=vmax.dtype)))
+        vsum = np.concatenate((vsum, np.zeros(pad, dtype=vsum.dtype)))
+        count = np.concatenate((count, np.zeros(pad, dtype=count.dtype)))
+    shape = (-1, factor)
+    with np.errstate(invalid='ignore'):
+        return (time.reshape(shape)[:, 0],
+                np.fmin.reduce(vmin.reshape(shape), axis=1),
+                np.fmax.reduce(vmax.reshape(shape), axis=1),
+                vsum.reshape(shape).sum(axis=1),
+                count.reshape(shape).sum(axis=1))
+
+
+class LodPyramid:
+    """
+    Multi-resolution min/max/mean pyramid over the recorded channels.
+
+    Level 0 is the raw samples; each following level summarises `factor`
+    bins of the level below. Any time window can then be drawn from a level
+    with roughly as many bins as there are pixels, whatever the session length.
+    """
+    def __init__(self, channels, factor=4):
+        """
+        Args:
+            channels: Dictionary channel -> list of levels, each level a dict
+                with "time", "min", "max", "mean" and "count" arrays
+            factor: Number of bins merged per level
+        """
+        self.channels = channels
+        self.factor = factor
+
+    @classmethod
+    def build(cls, session, channels=FLOAT_CHANNELS, factor=4, min_bins=64):
+        """
+        Build the pyramid for a session.
+
+        Args:
+            session: Session dictionary from load_session
+            channels: Channels to summarise
+            factor: Number of bins merged per level
+            min_bins: Stop once a level has at most this many bins
+
+        Returns:
+            LodPyramid
+        """
+        ts = session["timestamp"]
+        pyramid = {}
+        for name in channels:
+            values = session[name].astype(np.float32)
+            valid = ~np.isnan(values)
+            time, vmin, vmax = ts, values, values
+            vsum = np.where(valid, values, 0).astype(np.float64)
+            count = valid.astype(np.int32)
+
+            levels = []
+            while True:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    mean = (vsum / count).astype(np.float32)
+                levels.append({"time": time, "min": vmin, "max": vmax, "mean": mean, "count": count})
+                if len(time) <= min_bins:
+                    break
+                time, vmin, vmax, vsum, count = _reduce_level(time, vmin, vmax, vsum, count, factor)
+            pyramid[name] = levels
+        return cls(pyramid, factor)
+
+    def save(self, path):
+        """
+        Save the pyramid as an .npz file.
+        """
+        arrays = {"factor": np.array(self.factor)}
+        for name, levels in self.channels.items():
+            for k, level in enumerate(levels):
+                for key, values in level.items():
+                    arrays[f"{name}/{k}/{key}"] = values
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a pyramid saved with save().
+        """
+        channels = {}
+        with np.load(path) as data:
+            factor = int(data["factor"])
+            for key in data.files:
+                if key == "factor":
+                    continue
+                name, k, field = key.split("/")
+                levels = channels.setdefault(name, {})
+                levels.setdefault(int(k), {})[field] = data[key]
+        return cls({name: [levels[k] for k in sorted(levels)] for name, levels in channels.items()},
+                   factor)
+
+    @classmethod
+    def for_session(cls, session_path, **kwargs):
+        """
+        Load the pyramid stored alongside a session file, (re)building it if it
+        is missing or older than the session.
+        """
+        path = lod_path(session_path)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(session_path):
+            return cls.load(path)
+        pyramid = cls.build(load_session(session_path), **kwargs)
+        pyramid.save(path)
+        return pyramid
+
+    def level_for(self, channel, t0, t1, pixel_width, points_per_pixel=1):
+        """
+        Finest level that draws [t0, t1] with at most pixel_width * points_per_pixel bins.
+        """
+        levels = self.channels[channel]
+        raw = levels[0]["time"]
+        n = np.searchsorted(raw, t1, side='right') - np.searchsorted(raw, t0, side='left')
+        budget = max(1, pixel_width * points_per_pixel)
+        if n <= budget:
+            return 0
+        k = int(math.ceil(math.log(n / budget, self.factor)))
+        return min(k, len(levels) - 1)
+
+    def query(self, channel, t0, t1, pixel_width, points_per_pixel=1):
+        """
+        Bins covering [t0, t1] at the right level for a plot pixel_width wide.
+
+        Args:
+            channel: Channel name (e.g. "x" or "left_psize")
+            t0: Window start time
+            t1: Window end time
+            pixel_width: Width of the plot in pixels
+            points_per_pixel: Bins allowed per pixel
+
+        Returns:
+            Dictionary with "level", "time", "min", "max", "mean" and "count"
+        """
+        k = self.level_for(channel, t0, t1, pixel_width, points_per_pixel)
+        level = self.channels[channel][k]
+        time = level["time"]
+        # Include the bin that starts before t0 but overlaps the window
+        lo = max(np.searchsorted(time, t0, side='right') - 1, 0)
+        hi = np.searchsorted(time, t1, side='right')
+        window = {key: values[lo:hi] for key, values in level.items()}
+        window["level"] = k
+        return window
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) > 1:
+        pyramid = LodPyramid.for_session(sys.argv[1])
+        for name, levels in pyramid.channels.items():
+            print(f"{name}: {len(levels)} levels, bins per level {[len(l['time']) for l in levels]}")
+    else:
+        # One hour at 60 Hz
+        n = 60 * 60 * 60
+        rng = np.random.default_rng(0)
+        session = {"timestamp": np.cumsum(rng.normal(1 / 60, 0.001, n))}
+        for name in FLOAT_CHANNELS:
+            session[name] = rng.normal(500, 50, n)
+        start = time.perf_counter()
+        pyramid = LodPyramid.build(session)
+        print(f"Built pyramid over {n} samples in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        ts = session["timestamp"]
+        start = time.perf_counter()
+        for _ in range(1000):
+            t0 = rng.uniform(ts[0], ts[-1])
+            window = pyramid.query("x", t0, t0 + rng.uniform(1, 3600), 1920)
+        print(f"Query: {(time.perf_counter() - start):.3f} ms per window, "
+              f"last one {len(window['time'])} bins at level {window['level']}")
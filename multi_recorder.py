@@ -0,0 +1,283 @@
+import csv
+import json
+import os
+import queue
+import selectors
+import socket
+import threading
+import time
+
+from new_eyetribe_utils import (
+    HEARTBEAT_INTERVAL, HEARTBEAT_REQUEST, is_frame, parse_chunk, send_request, start_eyetracker
+)
+
+FIELDNAMES = ["timestamp", "source", "x", "y", "fix", "state", "left_psize", "right_psize", "message"]
+
+
+class TrackerStream:
+    """
+    One Eye Tribe connection handled by a RecorderManager.
+    """
+    def __init__(self, name, sock, output_file):
+        self.name = name
+        self.sock = sock
+        self.output_file = output_file
+        self.csv_file = None
+        self.writer = None
+        self.buffer = ""
+        self.decoder = json.JSONDecoder()
+        self.rows = []
+        self.connected = True
+
+    def open(self):
+        self.csv_file = open(self.output_file, mode='w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.csv_file, fieldnames=FIELDNAMES)
+        self.writer.writeheader()
+
+    def write(self, row):
+        row["source"] = self.name
+        self.writer.writerow(row)
+        self.rows.append(row)
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.writer = None
+
+
+class RecorderManager:
+    """
+    Records any number of Eye Tribe trackers from a single I/O thread.
+
+    All sockets are non-blocking and multiplexed with a selector, so the
+    thread sleeps until data arrives or the next heartbeat is due instead
+    of polling with a timeout.
+    Messages are timestamped once and written to every stream by the I/O
+    thread, so markers line up exactly across trackers.
+    """
+    def __init__(self, output_prefix=None, heartbeat_interval=HEARTBEAT_INTERVAL):
+        """
+        Initialize the manager.
+
+        Args:
+            output_prefix: Prefix for the per-tracker CSV files
+                (auto-generated from the current time if None)
+            heartbeat_interval: Seconds between heartbeats sent to every tracker
+        """
+        if output_prefix is None:
+            output_prefix = f"gaze_data_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+        self.output_prefix = output_prefix
+        self.heartbeat_interval = heartbeat_interval
+
+        self.streams = {}
+        self.selector = None
+        self.is_recording = False
+        self.recording_thread = None
+        self.messages = queue.Queue()
+        self.wake_recv, self.wake_send = socket.socketpair()
+
+    def add_tracker(self, name, sock=None, host='127.0.0.1', port=6555, output_file=None):
+        """
+        Register a tracker connection.
+
+        Args:
+            name: Source label written with every sample of this tracker
+            sock: Connected socket with push mode enabled (connects with
+                start_eyetracker(host, port) if None)
+            host: Tracker server host
+            port: Tracker server port
+            output_file: CSV file for this tracker (defaults to <prefix>_<name>.csv)
+
+        Returns:
+            True if the tracker was added, False otherwise
+        """
+        if self.is_recording:
+            print("[ERROR] Cannot add trackers while recording.")
+            return False
+        if name in self.streams:
+            print(f"[ERROR] Tracker '{name}' already added.")
+            return False
+        if sock is None:
+            sock = start_eyetracker(host, port)
+            if sock is None:
+                return False
+        if output_file is None:
+            output_file = f"{self.output_prefix}_{name}.csv"
+        self.streams[name] = TrackerStream(name, sock, output_file)
+        return True
+
+    def start_recording(self):
+        """
+        Open the output files and start the shared I/O thread.
+        """
+        if self.is_recording:
+            print("[WARNING] Recording is already in progress.")
+            return False
+        if not self.streams:
+            print("[ERROR] No trackers added.")
+            return False
+
+        self.selector = selectors.DefaultSelector()
+        self.wake_recv.setblocking(False)
+        self.selector.register(self.wake_recv, selectors.EVENT_READ, None)
+        for stream in self.streams.values():
+            stream.open()
+            stream.sock.setblocking(False)
+            self.selector.register(stream.sock, selectors.EVENT_READ, stream)
+
+        self.is_recording = True
+        self.recording_thread = threading.Thread(target=self._io_loop)
+        self.recording_thread.daemon = True
+        self.recording_thread.start()
+
+        files = ", ".join(os.path.basename(s.output_file) for s in self.streams.values())
+        print(f"Recording started for {len(self.streams)} tracker(s): {files}")
+        return True
+
+    def _io_loop(self):
+        """
+        Internal I/O loop: wait for readable sockets and dispatch.
+        """
+        next_heartbeat = time.time()
+        try:
+            while self.is_recording:
+                now = time.time()
+                if now >= next_heartbeat:
+                    self._send_heartbeats()
+                    next_heartbeat = now + self.heartbeat_interval
+                for key, _ in self.selector.select(max(0.0, next_heartbeat - now)):
+                    if key.data is None:
+                        self._drain_messages()
+                    else:
+                        self._read_stream(key.data)
+        except Exception as e:
+            print(f"[ERROR] Recording error: {e}")
+        finally:
+            # Flush markers sent just before stop_recording
+            self._drain_messages()
+        print("Recording thread stopped.")
+
+    def _send_heartbeats(self):
+        for stream in self.streams.values():
+            if stream.connected:
+                try:
+                    send_request(stream.sock, HEARTBEAT_REQUEST)
+                except (BlockingIOError, InterruptedError):
+                    # Send buffer full; the next heartbeat will go out on schedule
+                    pass
+                except OSError as e:
+                    print(f"[ERROR] Heartbeat failed on '{stream.name}': {e}")
+
+    def _read_stream(self, stream):
+        try:
+            data = stream.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            print(f"[ERROR] Socket read error on '{stream.name}': {e}")
+            data = b""
+
+        if not data:
+            print(f"[WARNING] Tracker '{stream.name}' disconnected.")
+            self.selector.unregister(stream.sock)
+            stream.connected = False
+            return
+
+        stream.buffer += data.decode('utf-8', errors='replace').strip()
+        while stream.buffer:
+            try:
+                obj, idx = stream.decoder.raw_decode(stream.buffer)
+                stream.buffer = stream.buffer[idx:].lstrip()
+                if not is_frame(obj):
+                    # Heartbeat and request replies
+                    continue
+                parsed_row = parse_chunk(obj)
+                if parsed_row:
+                    stream.write(parsed_row)
+            except json.JSONDecodeError:
+                # Incomplete JSON, wait for more data
+                break
+
+    def _drain_messages(self):
+        try:
+            while self.wake_recv.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        while True:
+            try:
+                message_row = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            for stream in self.streams.values():
+                if stream.writer:
+                    stream.write(dict(message_row))
+
+    def send_message(self, message_content):
+        """
+        Send a message that will be recorded in every tracker's CSV file
+        with the same timestamp.
+
+        Args:
+            message_content: Content of the message (e.g., "Stimulus ON")
+
+        Returns:
+            True if message was queued successfully, False otherwise
+        """
+        if not self.is_recording:
+            print("[ERROR] Recording not active. Start recording before sending messages.")
+            return False
+
+        self.messages.put({
+            "timestamp": time.time(),
+            "x": "",
+            "y": "",
+            "fix": "",
+            "state": "",
+            "left_psize": "",
+            "right_psize": "",
+            "message": message_content
+        })
+        self.wake_send.send(b"\0")
+        print(f"Message recorded: {message_content}")
+        return True
+
+    def stop_recording(self):
+        """
+        Stop the I/O thread and close all CSV files.
+
+        Returns:
+            Dictionary mapping tracker name to its list of recorded rows
+        """
+        if not self.is_recording:
+            print("[WARNING] No recording in progress.")
+            return {name: s.rows for name, s in self.streams.items()}
+
+        self.is_recording = False
+        self.wake_send.send(b"\0")
+        if self.recording_thread:
+            self.recording_thread.join(timeout=2.0)
+
+        self.selector.close()
+        self.selector = None
+        for stream in self.streams.values():
+            stream.close()
+            stream.sock.setblocking(True)
+
+        total = sum(len(s.rows) for s in self.streams.values())
+        print(f"Recording stopped. Total rows recorded: {total}")
+        return {name: s.rows for name, s in self.streams.items()}
+
+    def close(self):
+        """
+        Close all tracker connections and the wake-up channel.
+        """
+        if self.is_recording:
+            self.stop_recording()
+        for stream in self.streams.values():
+            stream.sock.close()
+        self.wake_recv.close()
+        self.wake_send.close()
+        print("Eye Tribe connections closed.")
@@ -1,6 +1,7 @@
 import socket
 import json
 import csv
+import threading
 import time
 from datetime import datetime
 
@@ -27,10 +28,42 @@ def parse_chunk(chunk):
         return None
 
 
-def start_eyetracker():
+# Eye Tribe servers drop clients that miss heartbeats; 3000 ms is the server default
+HEARTBEAT_INTERVAL = 3.0
+HEARTBEAT_REQUEST = {"category": "heartbeat"}
+HEARTBEAT_INTERVAL_REQUEST = {
+    "category": "tracker",
+    "request": "get",
+    "values": ["heartbeatinterval"]
+}
+# Connection is considered dead after this many heartbeat intervals without data
+WATCHDOG_INTERVALS = 3
+CONNECT_TIMEOUT = 5.0
+
+
+def send_request(sock, request):
+    """
+    Send one JSON request to the Eye Tribe server.
+    """
+    sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+
+def is_frame(obj):
+    """
+    True if a decoded server message carries a gaze frame (as opposed to
+    replies to heartbeats and other requests).
+    """
+    return obj.get("category") == "tracker" and "frame" in obj.get("values", {})
+
+
+def start_eyetracker(host='127.0.0.1', port=6555, timeout=CONNECT_TIMEOUT):
+    sock = None
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect(('127.0.0.1', 6555))
+        # Bound the connect so an unreachable host cannot stall a reconnect
+        sock.settimeout(timeout)
+        sock.connect((host, port))
+        sock.settimeout(None)
         print("Connected to Eye Tribe server.")
 
         push_request = {
@@ -38,12 +71,13 @@ def start_eyetracker():
             "request": "set",
             "values": {"push": True}
         }
-        message = json.dumps(push_request).encode('utf-8') + b'\n'
-        sock.sendall(message)
+        send_request(sock, push_request)
         print("Push mode enabled.")
         return sock
     except Exception as e:
         print(f"[ERROR] Failed to connect to Eye Tribe: {e}")
+        if sock is not None:
+            sock.close()
         return None
 
 def stop_eyetracker(sock):
@@ -85,18 +119,44 @@ class EyeTrackingRecorder:
     """
     Class for continuous eye tracking data recording with the ability to send messages.
     """
-    def __init__(self, sock, output_file=None):
+    def __init__(self, sock, output_file=None, heartbeat_interval=HEARTBEAT_INTERVAL,
+                 reconnect=True, max_backoff=10.0, host=None, port=None,
+                 watchdog_intervals=WATCHDOG_INTERVALS):
         """
         Initialize the eye tracking recorder.
         
         Args:
             sock: Socket connected to the Eye Tribe server
             output_file: File to save the data (auto-generated if None)
+            heartbeat_interval: Seconds between heartbeats (updated from the
+                server's heartbeatinterval once it replies)
+            reconnect: Reconnect automatically if the connection is lost
+            max_backoff: Longest wait in seconds between reconnection attempts
+            host: Server host for reconnecting (defaults to the socket's peer)
+            port: Server port for reconnecting (defaults to the socket's peer)
+            watchdog_intervals: Heartbeat intervals without any data from the
+                server after which the connection is treated as lost
         """
         self.sock = sock
         if self.sock is None:
             raise ValueError("[ERROR] No valid socket provided.")
             
+        if host is None or port is None:
+            peer_host, peer_port = self.sock.getpeername()[:2]
+            host = peer_host if host is None else host
+            port = peer_port if port is None else port
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect = reconnect
+        self.max_backoff = max_backoff
+        self.owns_sock = False
+        self.next_heartbeat = 0.0
+        self.watchdog_intervals = watchdog_intervals
+        self.last_receive = 0.0
+        self.last_sample_time = None
+        self.gaps = []
+            
         if output_file is None:
             timestamp_str = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
             output_file = f'gaze_data_{timestamp_str}.csv'
@@ -109,6 +169,10 @@ class EyeTrackingRecorder:
         self.buffer = ""
         self.decoder = json.JSONDecoder()
         self.all_rows = []
+        self.first_sample = None
+        self.first_sample_time = None
+        self.stop_event = threading.Event()
+        self.write_lock = threading.Lock()
         
     def start_recording(self):
         """
@@ -118,14 +182,15 @@ class EyeTrackingRecorder:
             print("[WARNING] Recording is already in progress.")
             return False
             
-        import threading
-        
         self.csv_file = open(self.output_file, mode='w', newline='', encoding='utf-8')
         self.writer = csv.DictWriter(self.csv_file, fieldnames=[
             "timestamp", "x", "y", "fix", "state", "left_psize", "right_psize", "message"
         ])
         self.writer.writeheader()
         
+        self.first_sample = threading.Event()
+        self.first_sample_time = None
+        self.stop_event.clear()
         self.is_recording = True
         self.recording_thread = threading.Thread(target=self._record_loop)
         self.recording_thread.daemon = True
@@ -137,25 +202,50 @@ class EyeTrackingRecorder:
     def _record_loop(self):
         """
         Internal method for continuous data recording.
+        
+        Heartbeats are sent from this loop between reads, so they never block
+        sample reception. If the connection drops, or the server sends nothing
+        (neither frames nor heartbeat replies) for watchdog_intervals
+        heartbeat intervals, the loop reconnects and records the outage as a gap.
         """
-        self.sock.settimeout(0.1)  # Small timeout to check is_recording flag
+        self._start_session()
         
         try:
             while self.is_recording:
                 try:
-                    data = self.sock.recv(4096).decode('utf-8', errors='replace')
-                    self.buffer += data.strip()
+                    now = time.time()
+                    silence = now - self.last_receive
+                    if silence > self.watchdog_intervals * self.heartbeat_interval:
+                        raise ConnectionError(f"No data from server for {silence:.1f} s")
+                    if now >= self.next_heartbeat:
+                        send_request(self.sock, HEARTBEAT_REQUEST)
+                        self.next_heartbeat = now + self.heartbeat_interval
+                    
+                    # Wake up for the next heartbeat or to check the is_recording flag
+                    self.sock.settimeout(max(0.001, min(0.1, self.next_heartbeat - now)))
+                    raw = self.sock.recv(4096)
+                    if not raw:
+                        raise ConnectionError("Connection closed by server")
+                    self.last_receive = time.time()
+                    self.buffer += raw.decode('utf-8', errors='replace').strip()
                     
                     while self.buffer:
                         try:
                             obj, idx = self.decoder.raw_decode(self.buffer)
                             self.buffer = self.buffer[idx:].lstrip()
                             
+                            if not is_frame(obj):
+                                self._handle_reply(obj)
+                                continue
+                            
                             # Parse and write eye tracking data
                             parsed_row = parse_chunk(obj)
                             if parsed_row and self.writer:
-                                self.writer.writerow(parsed_row)
-                                self.all_rows.append(parsed_row)
+                                self._write_row(parsed_row)
+                                self.last_sample_time = parsed_row["timestamp"]
+                                if self.first_sample_time is None:
+                                    self.first_sample_time = time.perf_counter()
+                                    self.first_sample.set()
                                 
                         except json.JSONDecodeError:
                             # Incomplete JSON, wait for next recv()
@@ -164,9 +254,10 @@ class EyeTrackingRecorder:
                     # Just a timeout to allow checking the is_recording flag
                     continue
                 except Exception as e:
+                    if not self.is_recording:
+                        break
                     print(f"[ERROR] Socket read error: {e}")
-                    if self.is_recording:
-                        # Only break the loop if we're still supposed to be recording
+                    if not self.reconnect or not self._reconnect():
                         break
         
         except Exception as e:
@@ -174,22 +265,81 @@ class EyeTrackingRecorder:
         
         print("Recording thread stopped.")
         
-    def send_message(self, message_content):
+    def _start_session(self):
         """
-        Send a message that will be recorded in the CSV file.
+        Reset per-connection state and ask the server for its heartbeat interval.
+        """
+        self.buffer = ""
+        self.next_heartbeat = time.time()
+        self.last_receive = self.next_heartbeat
+        try:
+            send_request(self.sock, HEARTBEAT_INTERVAL_REQUEST)
+        except OSError as e:
+            print(f"[WARNING] Could not query heartbeat interval: {e}")
+        
+    def _handle_reply(self, obj):
+        """
+        Handle non-frame server messages (heartbeat and request replies).
+        """
+        values = obj.get("values")
+        if isinstance(values, dict) and "heartbeatinterval" in values:
+            self.heartbeat_interval = values["heartbeatinterval"] / 1000.0
+            self.next_heartbeat = min(self.next_heartbeat, time.time() + self.heartbeat_interval)
+        
+    def _reconnect(self):
+        """
+        Reconnect with bounded exponential backoff and re-enable push mode.
+        
+        The gap starts at the last sample received, not when the loss was
+        detected (which can be several heartbeat intervals later); both
+        times are kept in self.gaps.
         
-        Args:
-            message_content: Content of the message (e.g., "Stimulus ON")
-            
         Returns:
-            True if message was sent successfully, False otherwise
+            True once reconnected, False if recording was stopped first
         """
-        if not self.is_recording or not self.writer:
-            print("[ERROR] Recording not active. Start recording before sending messages.")
-            return False
-            
+        detected = time.time()
+        gap_start = detected if self.last_sample_time is None else self.last_sample_time
+        self._write_message("GAP START", gap_start)
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        
+        delay = 0.1
+        while self.is_recording:
+            print(f"Reconnecting to Eye Tribe at {self.host}:{self.port}...")
+            sock = start_eyetracker(self.host, self.port)
+            if sock is not None:
+                if not self.is_recording:
+                    # Recording stopped while connecting
+                    stop_eyetracker(sock)
+                    break
+                self.sock = sock
+                self.owns_sock = True
+                gap_end = time.time()
+                duration = gap_end - gap_start
+                self.gaps.append({"start": gap_start, "detected": detected, "end": gap_end,
+                                  "duration": duration})
+                self._write_message(f"GAP END {duration:.3f}", gap_end)
+                # A drop before the next frame starts a new gap here, not at the
+                # last sample before this one
+                self.last_sample_time = gap_end
+                self._start_session()
+                return True
+            if self.stop_event.wait(delay):
+                break
+            delay = min(delay * 2, self.max_backoff)
+        return False
+        
+    def _write_row(self, row):
+        with self.write_lock:
+            if self.writer:
+                self.writer.writerow(row)
+                self.all_rows.append(row)
+        
+    def _write_message(self, message_content, timestamp=None):
         message_row = {
-            "timestamp": time.time(),
+            "timestamp": time.time() if timestamp is None else timestamp,
             "x": "",
             "y": "",
             "fix": "",
@@ -198,10 +348,24 @@ class EyeTrackingRecorder:
             "right_psize": "",
             "message": message_content
         }
-        
-        self.writer.writerow(message_row)
-        self.all_rows.append(message_row)
+        self._write_row(message_row)
         print(f"Message recorded: {message_content}")
+        
+    def send_message(self, message_content):
+        """
+        Send a message that will be recorded in the CSV file.
+        
+        Args:
+            message_content: Content of the message (e.g., "Stimulus ON")
+            
+        Returns:
+            True if message was sent successfully, False otherwise
+        """
+        if not self.is_recording or not self.writer:
+            print("[ERROR] Recording not active. Start recording before sending messages.")
+            return False
+            
+        self._write_message(message_content)
         return True
         
     def stop_recording(self):
@@ -216,14 +380,21 @@ class EyeTrackingRecorder:
             return self.all_rows
             
         self.is_recording = False
+        self.stop_event.set()
         
         if self.recording_thread:
             self.recording_thread.join(timeout=2.0)
             
-        if self.csv_file:
-            self.csv_file.close()
-            self.csv_file = None
-            self.writer = None
+        with self.write_lock:
+            if self.csv_file:
+                self.csv_file.close()
+                self.csv_file = None
+                self.writer = None
+            
+        # A socket opened by a reconnect is not known to the caller, so close it here
+        if self.owns_sock:
+            stop_eyetracker(self.sock)
+            self.owns_sock = False
             
         print(f"Recording stopped. Total rows recorded: {len(self.all_rows)}")
         return self.all_rows
@@ -0,0 +1,241 @@
+import collections
+import json
+import socket
+import threading
+import time
+
+from new_eyetribe_utils import (
+    HEARTBEAT_INTERVAL, HEARTBEAT_REQUEST, is_frame, parse_chunk, send_request
+)
+
+FRAME_REQUEST = {"category": "tracker", "request": "get", "values": ["frame"]}
+PUSH_OFF_REQUEST = {"category": "tracker", "request": "set", "values": {"push": False}}
+
+
+class PullClient:
+    """
+    Pull-mode Eye Tribe client: the caller decides when frames are sampled.
+
+    Several "get frame" requests are kept in flight over one connection.
+    The server answers requests in order, so replies are matched to
+    requests first-in first-out, which also gives the round-trip latency
+    of every request.
+    """
+    def __init__(self, host='127.0.0.1', port=6555, max_in_flight=4,
+                 heartbeat_interval=HEARTBEAT_INTERVAL):
+        """
+        Initialize the client.
+
+        Args:
+            host: Eye Tribe server host
+            port: Eye Tribe server port
+            max_in_flight: Maximum number of unanswered frame requests
+            heartbeat_interval: Seconds between heartbeats
+        """
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.heartbeat_interval = heartbeat_interval
+
+        self.sock = None
+        self.reader_thread = None
+        self.running = False
+        self.send_lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.pending = collections.deque()
+        self.next_heartbeat = 0.0
+
+        self.latest = None
+        self.rows = []
+        self.latencies = []
+        self.skipped = 0
+        self.callback = None
+
+    def connect(self):
+        """
+        Connect to the server and switch push mode off.
+
+        Returns:
+            True if connected, False otherwise
+        """
+        try:
+            self.sock = socket.create_connection((self.host, self.port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            send_request(self.sock, PUSH_OFF_REQUEST)
+        except OSError as e:
+            print(f"[ERROR] Failed to connect to Eye Tribe: {e}")
+            self.sock = None
+            return False
+
+        self.running = True
+        self.reader_thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader_thread.start()
+        print("Connected to Eye Tribe server (pull mode).")
+        return True
+
+    def request_frame(self, block=False):
+        """
+        Send one "get frame" request if a slot is free.
+
+        Args:
+            block: Wait for a free slot instead of skipping
+
+        Returns:
+            True if the request was sent, False if all slots were busy or
+            the send failed
+        """
+        if not self.slots.acquire(blocking=block):
+            self.skipped += 1
+            return False
+        with self.send_lock:
+            queued = False
+            try:
+                now = time.time()
+                if now >= self.next_heartbeat:
+                    send_request(self.sock, HEARTBEAT_REQUEST)
+                    self.next_heartbeat = now + self.heartbeat_interval
+                self.pending.append(time.perf_counter())
+                queued = True
+                send_request(self.sock, FRAME_REQUEST)
+            except OSError as e:
+                # No reply will come for this request: give its slot back
+                if queued:
+                    self.pending.pop()
+                self.slots.release()
+                print(f"[ERROR] Failed to send frame request: {e}")
+                return False
+        return True
+
+    def _read_loop(self):
+        """
+        Internal method matching replies to pending requests.
+        """
+        buffer = ""
+        decoder = json.JSONDecoder()
+        try:
+            while self.running:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                buffer += data.decode('utf-8', errors='replace').strip()
+                while buffer:
+                    try:
+                        obj, idx = decoder.raw_decode(buffer)
+                        buffer = buffer[idx:].lstrip()
+                    except json.JSONDecodeError:
+                        break
+                    if obj.get("category") == "tracker" and obj.get("request") == "get":
+                        self._handle_frame(obj)
+        except OSError as e:
+            if self.running:
+                print(f"[ERROR] Socket read error: {e}")
+        self.running = False
+
+    def _handle_frame(self, obj):
+        received = time.perf_counter()
+        with self.send_lock:
+            sent = self.pending.popleft() if self.pending else None
+        if sent is None:
+            # Unsolicited reply (e.g. pushed frame): no slot was taken for it
+            return
+        self.slots.release()
+        if not is_frame(obj):
+            return
+
+        row = parse_chunk(obj)
+        if row is None:
+            return
+        row["latency"] = received - sent
+        self.latest = row
+        self.rows.append(row)
+        self.latencies.append(row["latency"])
+        if self.callback:
+            self.callback(row)
+
+    def poll(self, rate, duration, callback=None):
+        """
+        Request frames at a fixed rate chosen by the caller.
+
+        Args:
+            rate: Requests per second
+            duration: How long to poll, in seconds
+            callback: Optional function called with each parsed row
+
+        Returns:
+            Number of requests sent
+        """
+        self.callback = callback
+        interval = 1.0 / rate
+        sent = 0
+        start = time.perf_counter()
+        tick = start
+        while self.running and tick - start < duration:
+            if self.request_frame():
+                sent += 1
+            tick += interval
+            delay = tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return sent
+
+    def wait_idle(self, timeout=1.0):
+        """
+        Wait until all in-flight requests have been answered.
+        """
+        deadline = time.perf_counter() + timeout
+        while self.pending and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        return not self.pending
+
+    def latency_stats(self):
+        """
+        Round-trip latency summary in milliseconds.
+
+        Returns:
+            Dictionary with "n", "mean", "median", "p95" and "max"
+        """
+        if not self.latencies:
+            return {"n": 0, "mean": None, "median": None, "p95": None, "max": None}
+        values = sorted(self.latencies)
+        n = len(values)
+        return {
+            "n": n,
+            "mean": 1000 * sum(values) / n,
+            "median": 1000 * values[n // 2],
+            "p95": 1000 * values[min(n - 1, int(0.95 * n))],
+            "max": 1000 * values[-1],
+        }
+
+    def close(self):
+        """
+        Stop the reader thread and close the connection.
+        """
+        self.running = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        if self.reader_thread:
+            self.reader_thread.join(timeout=1.0)
+        print("Eye Tribe connection closed.")
+
+
+if __name__ == "__main__":
+    # Pull rates well above 60 Hz against the local protocol stand-in
+    from eyetribe_stub_server import StubTrackerServer
+
+    server = StubTrackerServer(port=0).start()
+    for rate in (60, 120, 250, 500):
+        client = PullClient(server.host, server.port, max_in_flight=4)
+        client.connect()
+        sent = client.poll(rate, duration=2.0)
+        client.wait_idle()
+        stats = client.latency_stats()
+        print(f"{rate:>4} Hz requested: {len(client.rows) / 2.0:.0f} frames/s received, "
+              f"{sent} sent, {client.skipped} skipped, "
+              f"latency median {stats['median']:.2f} ms, p95 {stats['p95']:.2f} ms")
+        client.close()
+    server.stop()
@@ -0,0 +1,179 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gaze_session import FLOAT_CHANNELS, load_session
+from signal_quality import channel_invalid, invalid_samples
+
+
+def resample_session(session, rate=60.0, max_gap=0.15, channels=FLOAT_CHANNELS, invalid=None,
+                     min_psize=0.0):
+    """
+    Resample a session onto a uniform time grid.
+
+    Samples are stamped with time.time() at parse time, so they are irregular.
+    Each channel is linearly interpolated between its own valid samples (a
+    pupil dropout in one eye only affects that eye); grid points that fall
+    in a gap longer than max_gap seconds are NaN.
+
+    Args:
+        session: Session dictionary from load_session
+        rate: Output sampling rate in Hz
+        max_gap: Longest gap in seconds to interpolate across
+        channels: Channels to resample
+        invalid: Precomputed invalid_samples mask (computed if None)
+        min_psize: Pupil sizes at or below this value count as missing
+
+    Returns:
+        Dictionary with float64 "time" grid, one float32 array per channel,
+        a float32 "pupil" channel (mean of both eyes) and the "events" list
+    """
+    ts = session["timestamp"]
+    if invalid is None:
+        invalid = invalid_samples(session, min_psize=min_psize)
+    invalid = invalid | ~np.isfinite(ts)
+    vt = ts[~invalid]
+
+    resampled = {"rate": float(rate), "events": session["events"]}
+    if len(vt) < 2:
+        resampled["time"] = np.zeros(0)
+        for name in list(channels) + ["pupil"]:
+            resampled[name] = np.zeros(0, dtype=np.float32)
+        return resampled
+
+    grid = vt[0] + np.arange(int((vt[-1] - vt[0]) * rate) + 1) / rate
+    resampled["time"] = grid
+    for name in channels:
+        valid = ~channel_invalid(session, name, invalid, min_psize)
+        ct = ts[valid]
+        if len(ct) < 2:
+            resampled[name] = np.full(len(grid), np.nan, dtype=np.float32)
+            continue
+        values = np.interp(grid, ct, session[name][valid]).astype(np.float32)
+        # Distance between the valid samples that bracket each grid point
+        right = np.clip(np.searchsorted(ct, grid, side='left'), 1, len(ct) - 1)
+        values[(ct[right] - ct[right - 1]) > max_gap] = np.nan
+        values[(grid < ct[0]) | (grid > ct[-1])] = np.nan
+        resampled[name] = values
+
+    left_p = resampled.get("left_psize")
+    right_p = resampled.get("right_psize")
+    if left_p is not None and right_p is not None:
+        with np.errstate(invalid='ignore'):
+            # Mean of both eyes, falling back to whichever eye is available
+            pupil = np.where(np.isnan(left_p), right_p,
+                             np.where(np.isnan(right_p), left_p, (left_p + right_p) / 2))
+        resampled["pupil"] = pupil.astype(np.float32)
+    return resampled
+
+
+def find_events(events, pattern):
+    """
+    Return (timestamps, messages) of the events whose message matches a regex.
+    """
+    regex = re.compile(pattern)
+    matched = [(ts, msg) for ts, msg in events if regex.search(msg)]
+    return np.array([ts for ts, _ in matched], dtype=np.float64), [msg for _, msg in matched]
+
+
+def epoch(resampled, pattern, tmin=-0.5, tmax=5.0, channel="pupil", baseline=(None, 0.0),
+          baseline_mode="subtract"):
+    """
+    Build a trials x time matrix of one channel aligned to an event type.
+
+    Args:
+        resampled: Output of resample_session
+        pattern: Regex matched against event messages (e.g. r"IMAGE .* ON")
+        tmin: Start of the epoch relative to the event, in seconds
+        tmax: End of the epoch relative to the event, in seconds
+        channel: Channel to epoch
+        baseline: (start, end) of the baseline window relative to the event,
+            None meaning the epoch edge; pass None to skip baseline correction
+        baseline_mode: "subtract" or "divide" (relative change)
+
+    Returns:
+        Tuple (times, data, messages) where data is a float32 array of shape
+        (n_events, n_times), NaN outside the recording
+    """
+    rate = resampled["rate"]
+    grid = resampled["time"]
+    values = resampled[channel]
+    offsets = np.arange(int(round(tmin * rate)), int(round(tmax * rate)) + 1)
+    times = (offsets / rate).astype(np.float32)
+
+    onsets, messages = find_events(resampled["events"], pattern)
+    if len(onsets) == 0 or len(grid) == 0:
+        return times, np.zeros((0, len(offsets)), dtype=np.float32), messages
+
+    # Uniform grid: the sample index of each event is a single rounding
+    centre = np.rint((onsets - grid[0]) * rate).astype(np.int64)
+    index = centre[:, None] + offsets[None, :]
+    inside = (index >= 0) & (index < len(grid))
+    data = np.full(index.shape, np.nan, dtype=np.float32)
+    data[inside] = values[index[inside]]
+
+    if baseline is not None:
+        b0 = tmin if baseline[0] is None else baseline[0]
+        b1 = tmax if baseline[1] is None else baseline[1]
+        window = (times >= b0) & (times <= b1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            base = np.full(len(data), np.nan, dtype=np.float32)
+            has_base = np.isfinite(data[:, window]).any(axis=1)
+            base[has_base] = np.nanmean(data[has_base][:, window], axis=1)
+            if baseline_mode == "divide":
+                data = data / base[:, None] - 1.0
+            else:
+                data = data - base[:, None]
+    return times, data.astype(np.float32), messages
+
+
+def _epoch_file(args):
+    path, pattern, tmin, tmax, rate, channel, baseline, baseline_mode, max_gap = args
+    resampled = resample_session(load_session(path), rate=rate, max_gap=max_gap)
+    return epoch(resampled, pattern, tmin, tmax, channel, baseline, baseline_mode)
+
+
+def epoch_sessions(paths, pattern, tmin=-0.5, tmax=5.0, rate=60.0, channel="pupil",
+                   baseline=(None, 0.0), baseline_mode="subtract", max_gap=0.15, workers=None):
+    """
+    Load, resample and epoch several sessions in parallel.
+
+    Args:
+        paths: List of recorder CSV files
+        pattern: Regex matched against event messages
+        workers: Number of worker processes (None = one per CPU, 1 = no pool)
+        Other arguments: see resample_session and epoch
+
+    Returns:
+        Dictionary with "times" (float32), "data" (float32, all sessions
+        stacked along the first axis), "session" (int32 index into paths per
+        row) and "messages"
+    """
+    jobs = [(p, pattern, tmin, tmax, rate, channel, baseline, baseline_mode, max_gap) for p in paths]
+    if workers == 1 or len(jobs) <= 1:
+        results = [_epoch_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_epoch_file, jobs))
+
+    n_times = int(round(tmax * rate)) - int(round(tmin * rate)) + 1
+    times = results[0][0] if results else np.zeros(n_times, dtype=np.float32)
+    data = [r[1] for r in results]
+    return {
+        "times": times,
+        "data": np.concatenate(data) if data else np.zeros((0, n_times), dtype=np.float32),
+        "session": np.concatenate([np.full(len(d), i, dtype=np.int32) for i, d in enumerate(data)])
+        if data else np.zeros(0, dtype=np.int32),
+        "messages": [m for r in results for m in r[2]],
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    files = sys.argv[1:] or ["gaze_nico_test_5.csv"]
+    result = epoch_sessions(files, r"IMAGE .* ON", tmin=-0.5, tmax=5.0)
+    print(f"Epochs: {result['data'].shape} ({result['data'].dtype})")
+    for row, message in zip(result["data"], result["messages"]):
+        print(f"{message}: mean baseline-corrected pupil {np.nanmean(row):+.3f}")
@@ -5,10 +5,12 @@ import socket
 import json
 import time
 from eyetribe_utils import start_eyetracker, stop_eyetracker
+from gaze_heatmap import GazeHeatmap
 
 # Shared gaze variable
 current_gaze = {"x": None, "y": None}
 recording = True
+heatmap = None
 
 def gaze_stream(sock, screen_width, screen_height):
     global current_gaze
@@ -33,6 +35,8 @@ def gaze_stream(sock, screen_width, screen_height):
                         if 0 <= x <= screen_width and 0 <= y <= screen_height:
                             current_gaze["x"] = int(x)
                             current_gaze["y"] = int(y)
+                            if heatmap is not None:
+                                heatmap.add_sample(x, y)
                 except json.JSONDecodeError:
                     break
         except Exception as e:
@@ -40,7 +44,7 @@ def gaze_stream(sock, screen_width, screen_height):
             break
 
 def main():
-    global recording
+    global recording, heatmap
 
     # Connect to Eye Tribe
     sock = start_eyetracker()
@@ -55,6 +59,10 @@ def main():
     pygame.display.set_caption("Gaze Tracker")
     clock = pygame.time.Clock()
 
+    # Live attention heatmap (press H to toggle)
+    heatmap = GazeHeatmap(screen_width, screen_height)
+    show_heatmap = True
+
     # Start gaze streaming in a thread
     thread = threading.Thread(target=gaze_stream, args=(sock, screen_width, screen_height), daemon=True)
     thread.start()
@@ -69,16 +77,22 @@ def main():
         (3 * screen_width // 4, 3 * screen_height // 4),
     ]
 
-    print("Press ENTER to exit.")
+    print("Press ENTER to exit, H to toggle the heatmap.")
     running = True
     while running:
-        screen.fill((0, 0, 0))
-
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                show_heatmap = not show_heatmap
+
+        # Draw gaze heatmap (already composited over the background, so it replaces the fill)
+        if show_heatmap:
+            screen.blit(heatmap.to_pygame_surface(), (0, 0))
+        else:
+            screen.fill((0, 0, 0))
 
         # Draw calibration markers
         for roi in rois:
@@ -4,10 +4,12 @@ import socket
 import json
 import time
 from eyetribe_utils import start_eyetracker, stop_eyetracker
+from gaze_heatmap import GazeHeatmap
 
 # Shared gaze variable
 current_gaze = {"x": None, "y": None}
 recording = True
+heatmap = None
 
 def gaze_stream(sock, screen_width, screen_height):
     global current_gaze
@@ -43,6 +45,8 @@ def gaze_stream(sock, screen_width, screen_height):
                         if 0 <= x <= screen_width and 0 <= y <= screen_height:
                             current_gaze["x"] = int(x)
                             current_gaze["y"] = int(y)
+                            if heatmap is not None:
+                                heatmap.add_sample(x, y)
                             print(f"Updated current gaze to: x={current_gaze['x']}, y={current_gaze['y']}")
                 except json.JSONDecodeError as e:
                     print(f"JSON decode error: {e}")
@@ -56,7 +60,7 @@ def gaze_stream(sock, screen_width, screen_height):
             time.sleep(0.1)  # Add small delay to prevent tight loop in case of error
 
 def main():
-    global recording
+    global recording, heatmap
 
     print("Starting Eye Tribe gaze tracking application...")
     
@@ -91,6 +95,20 @@ def main():
         autoLog=False
     )
     print("Created gaze point indicator")
+
+    # Live attention heatmap, drawn as a low-resolution texture stretched to the window
+    heatmap = GazeHeatmap(screen_width, screen_height)
+    heatmap_rgb, heatmap_mask = heatmap.to_psychopy_arrays()
+    heatmap_stim = visual.ImageStim(
+        win=win,
+        image=heatmap_rgb,
+        mask=heatmap_mask,
+        size=(screen_width, screen_height),
+        units="pix",
+        autoLog=False
+    )
+    heatmap_time = time.time()
+    print("Created gaze heatmap overlay")
     
     # Start gaze streaming in a thread
     print("Starting gaze stream thread...")
@@ -154,6 +172,13 @@ def main():
         # Print debug info every 60 frames
         debug_frame = frame_count % 60 == 0
         
+        # Refresh the heatmap texture at most every refresh_interval seconds
+        now = time.time()
+        if now - heatmap_time >= heatmap.refresh_interval:
+            heatmap_stim.image, heatmap_stim.mask = heatmap.to_psychopy_arrays(now)
+            heatmap_time = now
+        heatmap_stim.draw()
+
         # Draw calibration markers
         for marker in calibration_markers:
             marker.draw()
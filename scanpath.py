@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gaze_session import find_trials, load_session
+
+DEFAULT_CACHE = "scanpath_cache.json"
+# Part of every cache key; bump when compare_scanpaths changes its results
+CACHE_VERSION = 2
+
+
+def extract_fixations(session, t0, t1, max_jump=50.0, min_duration=0.1):
+    """
+    Group the tracker's fixation samples in [t0, t1] into fixations.
+
+    A fixation is a run of samples flagged "fix" with valid coordinates;
+    a jump larger than max_jump pixels between consecutive samples starts
+    a new one.
+
+    Args:
+        session: Session dictionary from load_session
+        t0: Window start time
+        t1: Window end time
+        max_jump: Sample-to-sample distance in pixels that splits a fixation
+        min_duration: Shortest fixation kept, in seconds
+
+    Returns:
+        float64 array of shape (n, 3) with columns x, y, duration
+    """
+    ts = session["timestamp"]
+    lo, hi = np.searchsorted(ts, t0, side='left'), np.searchsorted(ts, t1, side='right')
+    ts = ts[lo:hi]
+    x, y = session["x"][lo:hi], session["y"][lo:hi]
+    on = session["fix"][lo:hi] & np.isfinite(x) & np.isfinite(y) & ((x != 0) | (y != 0))
+    if not on.any():
+        return np.zeros((0, 3))
+
+    jump = np.hypot(np.diff(x), np.diff(y)) > max_jump
+    starts = on & ~np.concatenate(([False], on[:-1] & ~jump))
+    label = np.cumsum(starts) - 1
+    idx = np.flatnonzero(on)
+    group = label[idx]
+
+    n = group[-1] + 1
+    count = np.bincount(group, minlength=n)
+    cx = np.bincount(group, weights=x[idx], minlength=n) / count
+    cy = np.bincount(group, weights=y[idx], minlength=n) / count
+    first = np.full(n, np.inf)
+    last = np.full(n, -np.inf)
+    np.minimum.at(first, group, ts[idx])
+    np.maximum.at(last, group, ts[idx])
+    duration = last - first
+
+    keep = duration >= min_duration
+    return np.column_stack((cx[keep], cy[keep], duration[keep]))
+
+
+def aoi_sequence(fixations, screen=(1920, 1080), grid=(5, 5), collapse=True):
+    """
+    Convert fixations to a sequence of grid AOI labels.
+
+    Args:
+        fixations: Array from extract_fixations
+        screen: Screen size in pixels (width, height)
+        grid: Number of AOI columns and rows
+        collapse: Merge consecutive fixations in the same AOI
+
+    Returns:
+        int32 array of AOI indices (row * columns + column)
+    """
+    if len(fixations) == 0:
+        return np.zeros(0, dtype=np.int32)
+    col = np.clip((fixations[:, 0] / screen[0] * grid[0]).astype(np.int32), 0, grid[0] - 1)
+    row = np.clip((fixations[:, 1] / screen[1] * grid[1]).astype(np.int32), 0, grid[1] - 1)
+    labels = row * grid[0] + col
+    if collapse:
+        labels = labels[np.concatenate(([True], labels[1:] != labels[:-1]))]
+    return labels
+
+
+def edit_distance(a, b):
+    """
+    Levenshtein distance between two integer sequences.
+
+    Each DP row is computed at once: substitutions and deletions come from
+    the previous row, and the insertion chain along the row is a running
+    minimum of (value - column), which removes the inner Python loop.
+    """
+    a = np.asarray(a)
+    b = np.asarray(b)
+    if len(a) == 0 or len(b) == 0:
+        return max(len(a), len(b))
+    cols = np.arange(len(b) + 1)
+    prev = cols.copy()
+    for i, symbol in enumerate(a, start=1):
+        t = np.empty_like(prev)
+        t[0] = i
+        t[1:] = np.minimum(prev[1:] + 1, prev[:-1] + (b != symbol))
+        prev = np.minimum.accumulate(t - cols) + cols
+    return int(prev[-1])
+
+
+def _dtw(va, vb):
+    # Total cost of the cheapest warping path between two sequences of 2D points
+    cost = np.hypot(va[:, None, 0] - vb[None, :, 0], va[:, None, 1] - vb[None, :, 1])
+
+    prev = np.cumsum(cost[0])
+    for i in range(1, len(va)):
+        c = cost[i]
+        t = np.empty_like(prev)
+        t[0] = c[0] + prev[0]
+        t[1:] = c[1:] + np.minimum(prev[1:], prev[:-1])
+        C = np.cumsum(c)
+        prev = np.minimum.accumulate(t - C) + C
+    return float(prev[-1])
+
+
+def vector_distance(fa, fb):
+    """
+    Dynamic time warping distance between the saccade vectors of two
+    scanpaths, vectorized per row like edit_distance.
+
+    Returns:
+        Tuple (total_cost, path_steps_bound) where the bound n + m normalises
+        the cost; (0.0, 0) if either scanpath has no saccades
+    """
+    va = np.diff(fa[:, :2], axis=0)
+    vb = np.diff(fb[:, :2], axis=0)
+    if len(va) == 0 or len(vb) == 0:
+        return 0.0, 0
+    return _dtw(va, vb), len(va) + len(vb)
+
+
+def compare_scanpaths(fa, fb, screen=(1920, 1080), grid=(5, 5)):
+    """
+    Similarity of two scanpaths, both in [0, 1] (1 = identical).
+
+    Scanpaths with a single fixation have no saccades; their vector
+    similarity compares the fixation positions instead. A scanpath without
+    fixations has nothing to compare, so both similarities are NaN rather
+    than counting missing data as a match.
+
+    Returns:
+        Tuple (string_similarity, vector_similarity)
+    """
+    if len(fa) == 0 or len(fb) == 0:
+        return float("nan"), float("nan")
+    sa = aoi_sequence(fa, screen, grid)
+    sb = aoi_sequence(fb, screen, grid)
+    longest = max(len(sa), len(sb))
+    string_sim = 1.0 - edit_distance(sa, sb) / longest
+
+    total, steps = vector_distance(fa, fb)
+    if not steps:
+        # One scanpath is a single fixation: every warping path has exactly
+        # max(n, m) steps, each a distance between fixation positions
+        total = _dtw(fa[:, :2], fb[:, :2])
+        steps = max(len(fa), len(fb))
+    diagonal = float(np.hypot(*screen))
+    vector_sim = 1.0 - min(1.0, total / (steps * diagonal))
+    return string_sim, vector_sim
+
+
+def _compare_job(args):
+    fa, fb, screen, grid = args
+    return compare_scanpaths(fa, fb, screen, grid)
+
+
+def session_key(path):
+    """
+    Identity of a session file for the cache: path, size and modification time.
+    """
+    stat = os.stat(path)
+    ident = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime}"
+    return hashlib.sha1(ident.encode('utf-8')).hexdigest()[:16]
+
+
+def session_fixations(path, **kwargs):
+    """
+    Fixations per stimulus for one recorder file.
+
+    Returns:
+        Dictionary image -> fixation array (first presentation of each image)
+    """
+    session = load_session(path)
+    result = {}
+    for trial in find_trials(session["events"]):
+        image = trial["image"]
+        if image is None or image in result or trial["image_on"] is None:
+            continue
+        off = trial["image_off"] if trial["image_off"] is not None else trial["end"]
+        if off is None:
+            continue
+        result[image] = extract_fixations(session, trial["image_on"], off, **kwargs)
+    return result
+
+
+def similarity_matrices(paths, screen=(1920, 1080), grid=(5, 5), cache_path=DEFAULT_CACHE,
+                        workers=None):
+    """
+    Pairwise scanpath similarity between sessions, per stimulus.
+
+    Pair results are cached by session identity, so adding one participant
+    only computes the new rows.
+
+    Args:
+        paths: Recorder CSV files, one per participant
+        screen: Screen size in pixels (width, height)
+        grid: Number of AOI columns and rows for the string comparison
+        cache_path: JSON cache file (None disables caching)
+        workers: Worker processes (None = one per CPU, 1 = no pool)
+
+    Returns:
+        Dictionary image -> {"sessions": paths viewing the image,
+        "string": float32 matrix, "vector": float32 matrix}; rows and
+        columns of sessions without fixations on the image are NaN
+    """
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    settings = f"v{CACHE_VERSION}|{screen[0]}x{screen[1]}|{grid[0]}x{grid[1]}"
+
+    keys = [session_key(p) for p in paths]
+    fixations = [session_fixations(p) for p in paths]
+    images = sorted({image for per_session in fixations for image in per_session})
+
+    jobs = []
+    slots = []
+    layout = {}
+    for image in images:
+        members = [i for i, per_session in enumerate(fixations) if image in per_session]
+        layout[image] = members
+        for a_pos, a in enumerate(members):
+            for b in members[a_pos + 1:]:
+                key = "|".join(sorted((keys[a], keys[b])) + [image, settings])
+                if key not in cache:
+                    jobs.append((fixations[a][image], fixations[b][image], screen, grid))
+                    slots.append(key)
+
+    if jobs:
+        if workers == 1 or len(jobs) < 8:
+            results = [_compare_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_compare_job, jobs, chunksize=max(1, len(jobs) // 64)))
+        for key, value in zip(slots, results):
+            cache[key] = list(value)
+        if cache_path:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+
+    output = {}
+    for image, members in layout.items():
+        n = len(members)
+        # A session without fixations on the image is not similar even to itself
+        self_sim = np.array([1.0 if len(fixations[i][image]) else np.nan for i in members],
+                            dtype=np.float32)
+        string = np.diag(self_sim)
+        vector = np.diag(self_sim)
+        for i in range(n):
+            for j in range(i + 1, n):
+                key = "|".join(sorted((keys[members[i]], keys[members[j]])) + [image, settings])
+                string[i, j] = string[j, i] = cache[key][0]
+                vector[i, j] = vector[j, i] = cache[key][1]
+        output[image] = {"sessions": [paths[i] for i in members], "string": string, "vector": vector}
+    print(f"Scanpath comparison: {len(jobs)} new pair(s) computed, "
+          f"{sum(len(m) * (len(m) - 1) // 2 for m in layout.values()) - len(jobs)} from cache")
+    return output
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    files = sys.argv[1:]
+    if files:
+        for image, result in similarity_matrices(files).items():
+            print(image)
+            print("  string:", np.round(result["string"], 3).tolist())
+            print("  vector:", np.round(result["vector"], 3).tolist())
+    else:
+        rng = np.random.default_rng(0)
+        paths = [np.column_stack((rng.uniform(0, 1920, 40), rng.uniform(0, 1080, 40),
+                                  rng.uniform(0.1, 0.5, 40))) for _ in range(60)]
+        start = time.perf_counter()
+        jobs = [(paths[i], paths[j], (1920, 1080), (5, 5))
+                for i in range(len(paths)) for j in range(i + 1, len(paths))]
+        with ProcessPoolExecutor() as pool:
+            list(pool.map(_compare_job, jobs, chunksize=32))
+        print(f"{len(jobs)} pairs of 40-fixation scanpaths in {time.perf_counter() - start:.2f} s")
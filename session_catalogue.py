@@ -0,0 +1,309 @@
+import bisect
+import csv
+import glob
+import io
+import os
+import re
+import sqlite3
+
+from gaze_session import columns_to_session, find_trials, header_columns, split_rows
+from signal_quality import interpolate_gaps, invalid_samples, trial_data_loss
+
+DEFAULT_DB = "gaze_catalogue.sqlite"
+PARTICIPANT_PATTERN = re.compile(r"^gaze_(.+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    participant TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    header TEXT NOT NULL,
+    n_samples INTEGER NOT NULL,
+    start REAL,
+    end REAL
+);
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    trial INTEGER NOT NULL,
+    image TEXT,
+    start REAL,
+    end REAL,
+    image_on REAL,
+    image_off REAL,
+    start_offset INTEGER NOT NULL,
+    end_offset INTEGER NOT NULL,
+    n_samples INTEGER NOT NULL,
+    loss_pct REAL,
+    loss_after_interp_pct REAL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    timestamp REAL NOT NULL,
+    message TEXT NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_participant ON sessions(participant);
+CREATE INDEX IF NOT EXISTS idx_trials_image ON trials(image);
+CREATE INDEX IF NOT EXISTS idx_trials_session ON trials(session_id);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events(session_id, timestamp);
+"""
+
+
+def participant_from_path(path):
+    """
+    Participant ID from a recorder file name (gaze_<participant>.csv).
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = PARTICIPANT_PATTERN.match(stem)
+    return match.group(1) if match else stem
+
+
+def scan_file(path):
+    """
+    Read a recorder CSV keeping the byte offset of every row.
+
+    Returns:
+        Tuple (header_line, cols, samples, sample_offsets, events, end_offset)
+        where events are (timestamp, message, offset) tuples
+    """
+    rows = []
+    row_offsets = []
+    with open(path, 'rb') as f:
+        header_line = f.readline().decode('utf-8').rstrip('\r\n')
+        cols = header_columns(next(csv.reader([header_line])))
+
+        offset = f.tell()
+        for line in f:
+            text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+            if text:
+                rows.append(next(csv.reader([text])))
+                row_offsets.append(offset)
+            offset += len(line)
+    samples, events = split_rows(rows, cols)
+    message_rows = {index for _, _, index in events}
+    offsets = [o for i, o in enumerate(row_offsets) if i not in message_rows]
+    events = [(ts, msg, row_offsets[index]) for ts, msg, index in events]
+    return header_line, cols, samples, offsets, events, offset
+
+
+class SessionCatalogue:
+    """
+    SQLite index of recorder sessions, trials, events and per-trial quality.
+
+    Files are ingested once; later updates only re-read files whose size or
+    modification time changed. Trials keep byte offsets into the CSV so
+    their samples can be loaded without reading the whole session.
+    """
+    def __init__(self, db_path=DEFAULT_DB):
+        """
+        Open (or create) the catalogue.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def update(self, patterns=("gaze_*.csv",)):
+        """
+        Ingest new or changed recorder files.
+
+        Args:
+            patterns: Glob patterns (or file paths) to scan
+
+        Sessions whose file no longer exists are removed, as are sessions
+        whose changed file can no longer be ingested, so the catalogue never
+        returns trials that load_trial cannot read.
+
+        Returns:
+            Number of files (re)ingested
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        paths = sorted({os.path.abspath(p) for pattern in patterns for p in glob.glob(pattern)})
+
+        known = {row["path"]: (row["size"], row["mtime"])
+                 for row in self.conn.execute("SELECT path, size, mtime FROM sessions")}
+        gone = [path for path in known if not os.path.exists(path)]
+        if gone:
+            with self.conn:
+                self.conn.executemany("DELETE FROM sessions WHERE path = ?", [(p,) for p in gone])
+            print(f"Removed {len(gone)} session(s) whose file no longer exists")
+        ingested = 0
+        for path in paths:
+            stat = os.stat(path)
+            if known.get(path) == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                self.ingest(path)
+                ingested += 1
+            except Exception as e:
+                print(f"[ERROR] Failed to ingest {path}: {e}")
+                # The old index no longer matches the file
+                with self.conn:
+                    self.conn.execute("DELETE FROM sessions WHERE path = ?", (path,))
+        return ingested
+
+    def ingest(self, path, participant=None):
+        """
+        (Re)index one recorder file.
+
+        Args:
+            path: Path to the recorder CSV
+            participant: Participant ID (derived from the file name if None)
+
+        Returns:
+            The session id
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        header_line, cols, samples, offsets, events, end_offset = scan_file(path)
+        session = columns_to_session(samples, cols, [(ts, msg) for ts, msg, _ in events])
+        ts = session["timestamp"]
+
+        invalid = invalid_samples(session)
+        _, filled = interpolate_gaps(session, invalid, channels=())
+        trials = find_trials(session["events"])
+        quality = {q["trial"]: q for q in trial_data_loss(session, invalid, invalid & ~filled, trials)}
+
+        # Every row (samples and messages) in file order, to map times to byte offsets;
+        # rows are written as they are stamped, so file order is time order
+        rows = sorted([(o, t) for t, o in zip(ts.tolist(), offsets)] +
+                      [(o, t) for t, _, o in events])
+        row_offsets = [o for o, _ in rows] + [end_offset]
+        row_ts = [t for _, t in rows]
+
+        with self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE path = ?", (path,))
+            cur = self.conn.execute(
+                "INSERT INTO sessions (path, participant, size, mtime, header, n_samples, start, end) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, participant or participant_from_path(path), stat.st_size, stat.st_mtime,
+                 header_line, len(ts),
+                 float(ts.min()) if len(ts) else None, float(ts.max()) if len(ts) else None))
+            session_id = cur.lastrowid
+
+            self.conn.executemany(
+                "INSERT INTO events (session_id, timestamp, message, offset) VALUES (?, ?, ?, ?)",
+                [(session_id, t, msg, o) for t, msg, o in events])
+
+            trial_rows = []
+            for trial in trials:
+                if trial["start"] is None or trial["end"] is None:
+                    continue
+                start_offset = row_offsets[bisect.bisect_left(row_ts, trial["start"])]
+                stop_offset = row_offsets[bisect.bisect_right(row_ts, trial["end"])]
+                q = quality.get(trial["trial"], {})
+                trial_rows.append((
+                    session_id, trial["trial"], trial["image"], trial["start"], trial["end"],
+                    trial["image_on"], trial["image_off"], start_offset, stop_offset,
+                    q.get("n_samples", 0), q.get("loss_pct"), q.get("loss_after_interp_pct")))
+            self.conn.executemany(
+                "INSERT INTO trials (session_id, trial, image, start, end, image_on, image_off, "
+                "start_offset, end_offset, n_samples, loss_pct, loss_after_interp_pct) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", trial_rows)
+
+        print(f"Indexed {os.path.basename(path)}: {len(ts)} samples, {len(trial_rows)} trials")
+        return session_id
+
+    def find_trials(self, participant=None, image=None, max_loss=None, min_samples=None):
+        """
+        Query trials across all indexed sessions.
+
+        Args:
+            participant: Participant ID to match
+            image: Stimulus file name to match (e.g. "DSC_0004.JPG")
+            max_loss: Maximum data loss in percent
+            min_samples: Minimum number of samples in the trial
+
+        Returns:
+            List of sqlite3.Row with trial columns plus "path", "participant"
+            and "header"
+        """
+        clauses = []
+        params = []
+        if participant is not None:
+            clauses.append("s.participant = ?")
+            params.append(participant)
+        if image is not None:
+            clauses.append("t.image = ?")
+            params.append(image)
+        if max_loss is not None:
+            clauses.append("t.loss_pct < ?")
+            params.append(max_loss)
+        if min_samples is not None:
+            clauses.append("t.n_samples >= ?")
+            params.append(min_samples)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.conn.execute(
+            "SELECT t.*, s.path, s.participant, s.header FROM trials t "
+            f"JOIN sessions s ON s.id = t.session_id {where} "
+            "ORDER BY s.participant, s.path, t.trial", params).fetchall()
+
+    def events(self, session_id, pattern=None):
+        """
+        Events of one session, optionally filtered with an SQL LIKE pattern.
+        """
+        if pattern is None:
+            return self.conn.execute(
+                "SELECT * FROM events WHERE session_id = ? ORDER BY timestamp", (session_id,)).fetchall()
+        return self.conn.execute(
+            "SELECT * FROM events WHERE session_id = ? AND message LIKE ? ORDER BY timestamp",
+            (session_id, pattern)).fetchall()
+
+    def load_trial(self, trial):
+        """
+        Load only the byte range of one trial from its recorder file.
+
+        Args:
+            trial: Row returned by find_trials
+
+        Returns:
+            Session dictionary (see gaze_session.load_session) for the trial
+        """
+        with open(trial["path"], 'rb') as f:
+            f.seek(trial["start_offset"])
+            chunk = f.read(trial["end_offset"] - trial["start_offset"]).decode('utf-8', errors='replace')
+
+        cols = header_columns(next(csv.reader([trial["header"]])))
+        samples, events = split_rows(csv.reader(io.StringIO(chunk)), cols)
+        return columns_to_session(samples, cols, [(ts, msg) for ts, msg, _ in events])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Index recorder sessions and query trials.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite catalogue file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_update = sub.add_parser("update", help="ingest new or changed recorder files")
+    p_update.add_argument("patterns", nargs="*", default=["gaze_*.csv"])
+    p_query = sub.add_parser("query", help="find trials")
+    p_query.add_argument("--participant")
+    p_query.add_argument("--image")
+    p_query.add_argument("--max-loss", type=float)
+    args = parser.parse_args()
+
+    catalogue = SessionCatalogue(args.db)
+    if args.command == "update":
+        print(f"{catalogue.update(args.patterns)} file(s) ingested.")
+    else:
+        start = time.perf_counter()
+        rows = catalogue.find_trials(args.participant, args.image, args.max_loss)
+        elapsed = (time.perf_counter() - start) * 1000
+        for row in rows:
+            print(f"{row['participant']} trial {row['trial']} {row['image']}: "
+                  f"{row['n_samples']} samples, {row['loss_pct']:.1f}% loss")
+        print(f"{len(rows)} trial(s) in {elapsed:.2f} ms")
+    catalogue.close()
@@ -0,0 +1,306 @@
+import time
+
+import numpy as np
+
+from gaze_session import FLOAT_CHANNELS, find_trials, load_session
+
+# Tracker state bitflags (Eye Tribe API, frame "state" field)
+STATE_TRACKING_GAZE = 0x1
+STATE_TRACKING_EYES = 0x2
+STATE_TRACKING_PRESENCE = 0x4
+STATE_TRACKING_FAIL = 0x8
+STATE_TRACKING_LOST = 0x10
+
+STATE_FLAGS = {
+    "tracking_gaze": STATE_TRACKING_GAZE,
+    "tracking_eyes": STATE_TRACKING_EYES,
+    "tracking_presence": STATE_TRACKING_PRESENCE,
+    "tracking_fail": STATE_TRACKING_FAIL,
+    "tracking_lost": STATE_TRACKING_LOST,
+}
+
+
+def decode_state(state):
+    """
+    Decode tracker state bitflags into boolean masks.
+
+    Args:
+        state: Integer array of frame states
+
+    Returns:
+        Dictionary mapping flag name to a boolean array
+    """
+    state = np.asarray(state, dtype=np.int32)
+    return {name: (state & bit) != 0 for name, bit in STATE_FLAGS.items()}
+
+
+def find_runs(mask):
+    """
+    Find contiguous runs of True in a boolean array.
+
+    Returns:
+        Tuple (starts, ends) of index arrays, ends exclusive
+    """
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def invalid_samples(session, min_psize=0.0):
+    """
+    Mask of samples without usable gaze: tracking flags missing or failed,
+    empty or (0, 0) coordinates, or both pupils missing.
+
+    Args:
+        session: Session dictionary from load_session
+        min_psize: Pupil sizes at or below this value count as missing
+
+    Returns:
+        Boolean array, True where the sample is invalid
+    """
+    flags = decode_state(session["state"])
+    x, y = session["x"], session["y"]
+    lost = ~flags["tracking_gaze"] | flags["tracking_fail"] | flags["tracking_lost"]
+    no_coords = np.isnan(x) | np.isnan(y) | ((x == 0) & (y == 0))
+    no_pupil = ~(session["left_psize"] > min_psize) & ~(session["right_psize"] > min_psize)
+    return lost | no_coords | no_pupil
+
+
+def channel_invalid(session, name, invalid, min_psize=0.0):
+    """
+    Invalid mask for one channel: the shared invalid mask plus the channel's
+    own missing values. A pupil size at or below min_psize from one eye is
+    missing for that eye even when the other eye keeps the sample valid.
+
+    Args:
+        session: Session dictionary from load_session
+        name: Channel name
+        invalid: Mask from invalid_samples
+        min_psize: Pupil sizes at or below this value count as missing
+
+    Returns:
+        Boolean array, True where the channel value is unusable
+    """
+    values = session[name]
+    if name.endswith("psize"):
+        return invalid | ~(values > min_psize)
+    return invalid | ~np.isfinite(values)
+
+
+def sample_period(ts):
+    """
+    Typical interval between samples (median of the timestamp differences).
+    """
+    if len(ts) < 2:
+        return 0.0
+    return float(np.median(np.diff(ts)))
+
+
+def detect_blinks(session, invalid=None, min_duration=0.05, max_duration=0.5, period=None):
+    """
+    Detect blinks as invalid-sample runs whose duration is plausible for a blink.
+    Longer runs are treated as tracking loss, shorter ones as noise.
+
+    Args:
+        session: Session dictionary from load_session
+        invalid: Precomputed invalid_samples mask (computed if None)
+        min_duration: Shortest blink in seconds
+        max_duration: Longest blink in seconds
+        period: Sample period in seconds (sample_period of the timestamps if None)
+
+    Returns:
+        Tuple (blink_mask, blinks) where blinks is an (n, 2) array of
+        [start, end) sample indices
+    """
+    if invalid is None:
+        invalid = invalid_samples(session)
+    ts = session["timestamp"]
+    starts, ends = find_runs(invalid)
+    if period is None:
+        period = sample_period(ts)
+    duration = _run_durations(ts, starts, ends, period)
+    keep = (duration >= min_duration) & (duration <= max_duration)
+    starts, ends = starts[keep], ends[keep]
+    return _runs_to_mask(len(invalid), starts, ends), np.column_stack((starts, ends))
+
+
+def _run_durations(ts, starts, ends, period):
+    # Span of the invalid samples plus one sample period, so a single
+    # dropped frame lasts one period rather than the two bracketing intervals
+    if len(starts) == 0:
+        return np.zeros(0)
+    return ts[ends - 1] - ts[starts] + period
+
+
+def _runs_to_mask(n, starts, ends):
+    # Runs from find_runs never touch, so starts and ends are all distinct
+    marks = np.zeros(n + 1, dtype=np.int8)
+    marks[starts] = 1
+    marks[ends] = -1
+    return np.cumsum(marks[:-1], dtype=np.int8) > 0
+
+
+def _fillable(ts, invalid, max_gap, period):
+    # Invalid runs short enough to fill and with valid samples on both sides
+    n = len(ts)
+    starts, ends = find_runs(invalid)
+    inner = (starts > 0) & (ends < n)
+    fillable = inner & (_run_durations(ts, starts, ends, period) <= max_gap)
+    return _runs_to_mask(n, starts[fillable], ends[fillable])
+
+
+def interpolate_gaps(session, invalid, max_gap=0.15, channels=FLOAT_CHANNELS, min_psize=0.0,
+                     period=None):
+    """
+    Linearly interpolate invalid runs that are no longer than max_gap seconds
+    and have valid samples on both sides. Longer gaps stay NaN.
+
+    Each channel is interpolated from its own valid samples (see
+    channel_invalid), so a pupil dropout in one eye is filled or set to NaN
+    for that eye only.
+
+    Args:
+        session: Session dictionary from load_session
+        invalid: Boolean mask of invalid samples
+        max_gap: Longest gap to fill, in seconds
+        channels: Channels to interpolate
+        min_psize: Pupil sizes at or below this value count as missing
+        period: Sample period in seconds (sample_period of the timestamps if None)
+
+    Returns:
+        Tuple (channels, filled) with a dictionary of interpolated float
+        arrays and the mask of samples of the shared invalid mask that were filled
+    """
+    ts = session["timestamp"]
+    if period is None:
+        period = sample_period(ts)
+    filled = _fillable(ts, invalid, max_gap, period)
+
+    out = {}
+    for name in channels:
+        bad = channel_invalid(session, name, invalid, min_psize)
+        # Only channels with extra missing values need their own gap search
+        fill = _fillable(ts, bad, max_gap, period) if (bad != invalid).any() else filled
+        valid = ~bad
+        values = np.where(bad, np.nan, session[name])
+        if fill.any() and valid.any():
+            values[fill] = np.interp(ts[fill], ts[valid], values[valid])
+        out[name] = values
+    return out, filled
+
+
+def trial_data_loss(session, invalid, remaining=None, trials=None):
+    """
+    Per-trial data-loss percentages.
+
+    Args:
+        session: Session dictionary from load_session
+        invalid: Boolean mask of invalid samples before cleaning
+        remaining: Boolean mask of samples still invalid after interpolation
+        trials: Trials from find_trials (derived from the session events if None)
+
+    Returns:
+        List of dicts with "trial", "image", "n_samples", "loss_pct" and
+        "loss_after_interp_pct"
+    """
+    if trials is None:
+        trials = find_trials(session["events"])
+    if remaining is None:
+        remaining = invalid
+    ts = session["timestamp"]
+
+    trials = [t for t in trials if t["start"] is not None and t["end"] is not None]
+    if not trials:
+        return []
+    bounds = np.array([(t["start"], t["end"]) for t in trials])
+    lo = np.searchsorted(ts, bounds[:, 0], side='left')
+    hi = np.searchsorted(ts, bounds[:, 1], side='right')
+    lost = np.concatenate(([0], np.cumsum(invalid)))
+    left = np.concatenate(([0], np.cumsum(remaining)))
+
+    counts = hi - lo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        loss = np.where(counts > 0, 100.0 * (lost[hi] - lost[lo]) / counts, 100.0)
+        after = np.where(counts > 0, 100.0 * (left[hi] - left[lo]) / counts, 100.0)
+
+    return [
+        {
+            "trial": t["trial"],
+            "image": t["image"],
+            "n_samples": int(c),
+            "loss_pct": float(l),
+            "loss_after_interp_pct": float(a),
+        }
+        for t, c, l, a in zip(trials, counts, loss, after)
+    ]
+
+
+def clean_session(session, max_gap=0.15, min_psize=0.0, blink_min=0.05, blink_max=0.5):
+    """
+    Run the whole cleaning stage over a session: decode states, detect
+    blinks, interpolate short gaps and report per-trial data loss.
+
+    Args:
+        session: Session dictionary from load_session
+        max_gap: Longest gap to interpolate, in seconds
+        min_psize: Pupil sizes at or below this value count as missing
+        blink_min: Shortest blink in seconds
+        blink_max: Longest blink in seconds
+
+    Returns:
+        Dictionary with the cleaned channels, the masks "invalid", "blink",
+        "interpolated" and "remaining_invalid", the decoded "flags", the
+        "blinks" index array and the per-trial "trial_loss" report
+    """
+    invalid = invalid_samples(session, min_psize=min_psize)
+    period = sample_period(session["timestamp"])
+    blink_mask, blinks = detect_blinks(session, invalid, blink_min, blink_max, period)
+    channels, filled = interpolate_gaps(session, invalid, max_gap=max_gap, min_psize=min_psize,
+                                        period=period)
+    remaining = invalid & ~filled
+
+    cleaned = dict(channels)
+    cleaned.update({
+        "timestamp": session["timestamp"],
+        "flags": decode_state(session["state"]),
+        "invalid": invalid,
+        "blink": blink_mask,
+        "blinks": blinks,
+        "interpolated": filled,
+        "remaining_invalid": remaining,
+        "trial_loss": trial_data_loss(session, invalid, remaining),
+    })
+    return cleaned
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        result = clean_session(load_session(sys.argv[1]))
+        for row in result["trial_loss"]:
+            print(f"Trial {row['trial']} ({row['image']}): {row['n_samples']} samples, "
+                  f"{row['loss_pct']:.1f}% lost, {row['loss_after_interp_pct']:.1f}% after interpolation")
+        print(f"Blinks detected: {len(result['blinks'])}")
+    else:
+        # Synthetic benchmark: 5 million samples at 30 Hz with blinks and dropouts
+        n = 5_000_000
+        rng = np.random.default_rng(0)
+        ts = np.cumsum(rng.normal(1 / 30, 0.002, n))
+        state = np.full(n, 7, dtype=np.int32)
+        psize = rng.normal(18.0, 0.5, n)
+        drop = rng.random(n) < 0.01
+        for k in range(1, 6):
+            drop[k:] |= drop[:-k] & (rng.random(n - k) < 0.8)
+        state[drop] = 0
+        psize[drop] = 0.0
+        session = {
+            "timestamp": ts, "x": rng.uniform(0, 1920, n), "y": rng.uniform(0, 1080, n),
+            "left_psize": psize, "right_psize": psize.copy(), "state": state,
+            "events": [(ts[i], f"TRIAL {i // 10000 + 1} {'START' if i % 10000 == 0 else 'END'}")
+                       for i in range(0, n, 5000)],
+        }
+        start = time.perf_counter()
+        result = clean_session(session)
+        elapsed = time.perf_counter() - start
+        print(f"Cleaned {n} samples in {elapsed:.3f} s "
+              f"({len(result['blinks'])} blinks, {len(result['trial_loss'])} trials)")